@@ -3,17 +3,21 @@
 import asyncio
 import hashlib
 import html
-import json
+import ipaddress
 import logging
 import os
-import re
+import random
 import time
-import traceback
-from collections import defaultdict
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 
 import httpx
+import orjson
 import sentry_sdk
+from cachetools import TTLCache
 
 from backend.roaster.logging_config import setup_logging
 
@@ -34,17 +38,16 @@ if SENTRY_DSN:
 
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, Response
+from fastapi.responses import HTMLResponse, JSONResponse, ORJSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 
-import anthropic
-
 from backend.roaster.card_generator import generate_card
-from backend.roaster.roast_engine import generate_roast
+from backend.roaster.roast_engine import complete_text, generate_roast, stream_roast
 from backend.roaster.wallet_analyzer import analyze_wallet
 from backend.roaster import db
 from backend.roaster import fairscale
+from backend.roaster import roast_engine
 
 # ── Telegram Bot ──
 TELEGRAM_BOT_TOKEN = os.environ.get("ROAST_TELEGRAM_BOT_TOKEN", "")
@@ -52,29 +55,74 @@ TELEGRAM_BOT_TOKEN = os.environ.get("ROAST_TELEGRAM_BOT_TOKEN", "")
 # ── Self-hosted analytics ──
 ANALYTICS_URL = os.environ.get("ANALYTICS_URL", "https://solana-narrative-radar-8vsib.ondigitalocean.app/api/analytics/event")
 
-async def track_event(event: str, properties: dict = None):
-    """Send analytics event to self-hosted store. Never blocks main flow."""
+ANALYTICS_BATCH_SIZE = 100
+
+# Shared client so analytics events reuse keep-alive connections (created on startup)
+_http: httpx.AsyncClient | None = None
+_event_queue: asyncio.Queue = asyncio.Queue(maxsize=10_000)
+
+
+def track_event(event: str, properties: dict = None):
+    """Queue analytics event for the background sender. Never blocks main flow."""
+    try:
+        _event_queue.put_nowait({
+            "app": "roast-bot",
+            "event": event,
+            "properties": properties or {},
+        })
+    except asyncio.QueueFull:
+        pass  # analytics is best-effort, drop under overload
+
+
+async def _post_event(payload: dict):
     try:
-        async with httpx.AsyncClient() as client:
-            await client.post(ANALYTICS_URL, json={
-                "app": "roast-bot",
-                "event": event,
-                "properties": properties or {},
-            }, timeout=5)
+        await _http.post(ANALYTICS_URL, json=payload)
     except Exception:
         pass
 
-app = FastAPI(title="Solana Roast Bot")
+
+async def _analytics_sender():
+    """Drain queued events in batches over the shared client."""
+    while True:
+        batch = [await _event_queue.get()]
+        while len(batch) < ANALYTICS_BATCH_SIZE and not _event_queue.empty():
+            batch.append(_event_queue.get_nowait())
+        # The analytics endpoint takes one event per request
+        await asyncio.gather(*(_post_event(e) for e in batch))
+
+
+class RoastJSONResponse(ORJSONResponse):
+    """orjson-encoded responses that tolerate int dict keys and odd types."""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=str, option=orjson.OPT_NON_STR_KEYS)
+
+
+app = FastAPI(title="Solana Roast Bot", default_response_class=RoastJSONResponse)
+
+def _init_db():
+    from backend.migrate import run_migrations
+    run_migrations()
+    db.init_db()  # SQLite fallback for local dev
+
 
 @app.on_event("startup")
 async def startup():
+    global _http
+    _http = httpx.AsyncClient(
+        timeout=5,
+        limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+    )
+
+    # Migrations open blocking connections; keep them off the event loop
     try:
-        from backend.migrate import run_migrations
-        run_migrations()
-        db.init_db()  # SQLite fallback for local dev
+        await asyncio.to_thread(_init_db)
     except Exception as e:
         logger.warning("DB init failed (will retry on first query): %s", e)
 
+    for job in (_reaper, _analytics_sender, _score_refresher):
+        _spawn(job())
+
     # Initialize Telegram bot if token is set
     if TELEGRAM_BOT_TOKEN:
         try:
@@ -86,6 +134,15 @@ async def startup():
         except Exception as e:
             logger.warning("Telegram bot init failed: %s", e)
 
+@app.on_event("shutdown")
+async def shutdown():
+    if _http is not None:
+        await _http.aclose()
+    await fairscale.aclose()
+    await roast_engine.aclose()
+    _card_pool.shutdown(wait=False, cancel_futures=True)
+
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -108,87 +165,241 @@ async def log_requests(request: Request, call_next):
 CACHE_TTL = 3600
 RATE_LIMIT = 10  # per IP+wallet per hour
 RATE_LIMIT_GLOBAL = 30  # per IP per hour
-STATS_FILE = Path(__file__).parent.parent / "data" / "stats.json"
+RATE_WINDOW = 3600  # seconds for an empty bucket to refill
+# Peers whose X-Forwarded-For is believed; the platform proxy reaches us from a private address
+TRUSTED_PROXIES = tuple(
+    ipaddress.ip_network(net.strip())
+    for net in os.environ.get(
+        "TRUSTED_PROXIES", "10.0.0.0/8,172.16.0.0/12,192.168.0.0/16,127.0.0.0/8,::1/128,fc00::/7"
+    ).split(",")
+    if net.strip()
+)
 STATIC_DIR = Path(__file__).parent / "static"
 ROAST_TIMEOUT = 30  # seconds
+ROAST_TIMEOUT_DETAIL = "Roast timed out — this wallet is too complex even for us 🕐"
+REAP_INTERVAL = 300  # seconds
+PERCENTILE_REFRESH = 60  # seconds
+RECENT_LIMIT = 20
+RECENT_RESYNC = 10  # seconds; picks up roasts saved outside this process (e.g. Telegram, other workers)
+OG_CACHE_CONTROL = "public, max-age=3600"
+ROBOTS_TXT = b"User-agent: *\nAllow: /\n"
 
 # --- In-memory stores ---
-roast_cache: dict[str, dict] = {}
-rate_limits: dict[str, list[float]] = defaultdict(list)
-
-WALLET_RE = re.compile(r"^[1-9A-HJ-NP-Za-km-z]{32,44}$")
-
-FUNNY_ERRORS = [
+roast_cache: TTLCache = TTLCache(maxsize=10_000, ttl=CACHE_TTL)
+# key -> (tokens, last refill); keys are packed IPs or (packed IP, wallet).
+# A bucket untouched for RATE_WINDOW is full again, same as a missing key,
+# so idle entries can simply expire.
+rate_limits: TTLCache = TTLCache(maxsize=100_000, ttl=RATE_WINDOW)
+_background_tasks: set[asyncio.Task] = set()
+_card_cache: TTLCache = TTLCache(maxsize=1024, ttl=CACHE_TTL)  # (wallet, fmt) -> (roast, image, etag)
+# Card renders are CPU-bound (Pillow drops the GIL while drawing and encoding); a
+# dedicated pool keeps a burst of them from starving the to_thread pool DB calls use
+_card_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix="card")
+# (distinct scores ascending, roasts scoring below each index, total roasts);
+# below[i] counts values[:i], so below[-1] is every roast that has a score
+_score_dist: tuple[list[float], list[int], int] = ([], [0], 0)
+_recent: deque[dict] = deque(maxlen=RECENT_LIMIT)  # oldest first
+_recent_synced = 0.0
+
+BASE58_ALPHABET = b"123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+
+
+def _is_base58(s: str) -> bool:
+    # str.isascii() is a flag check on CPython strings, which makes the ASCII
+    # encode a plain copy; translate then strips every Base58 byte in one C
+    # call and anything left over is an invalid character.
+    return s.isascii() and not s.encode("ascii").translate(None, BASE58_ALPHABET)
+
+PERSONAS = ("degen", "gordon", "shakespeare", "drill_sergeant")
+
+FUNNY_ERRORS = (
     "Even the blockchain doesn't want to talk about this wallet 💀",
     "This wallet is so bad our AI refused to roast it 🤖",
     "The Solana validators collectively agreed to pretend this wallet doesn't exist",
     "Our roast engine caught fire trying to process this dumpster fire 🔥",
     "Error 420: Too much copium detected",
-]
+)
 
 
 # --- Helpers ---
-def _load_stats() -> dict:
+def _client_ip(request: Request) -> bytes:
+    """Packed client IP (4 or 16 bytes), a compact rate-limit key.
+
+    Behind the platform proxy request.client is the proxy itself. The proxy
+    appends the peer it saw to X-Forwarded-For, so when the peer is a trusted
+    proxy use the last hop; earlier hops are client-supplied and trivially
+    spoofed. Anyone else reaching the app directly is keyed on their own address.
+    """
+    peer = request.client.host if request.client else ""
     try:
-        return json.loads(STATS_FILE.read_text())
-    except Exception:
-        return {"total_roasts": 0, "wallets": {}}
+        peer_ip = ipaddress.ip_address(peer)
+    except ValueError:
+        return peer.encode()
+    xff = request.headers.get("x-forwarded-for")
+    if xff and any(peer_ip in net for net in TRUSTED_PROXIES):
+        try:
+            return ipaddress.ip_address(xff.rsplit(",", 1)[-1].strip()).packed
+        except ValueError:
+            pass
+    return peer_ip.packed
+
 
+def _refill(key: bytes | tuple[bytes, str], capacity: int, now: float) -> float:
+    tokens, last = rate_limits.get(key, (capacity, now))
+    return min(capacity, tokens + (now - last) * capacity / RATE_WINDOW)
 
-def _save_stats(stats: dict):
-    STATS_FILE.parent.mkdir(parents=True, exist_ok=True)
-    STATS_FILE.write_text(json.dumps(stats))
 
+def _consume_rate_limit(ip: bytes, *wallets: str) -> bool:
+    """Take one token per wallet from the IP and IP+wallet buckets.
 
-def _check_rate_limit(ip: str, wallet: str) -> bool:
+    Buckets refill continuously to their capacity over RATE_WINDOW. Nothing is
+    taken if any bucket would run dry.
+    """
     now = time.time()
-    # Per IP+wallet
-    key = f"{ip}:{wallet}"
-    rate_limits[key] = [t for t in rate_limits[key] if now - t < 3600]
-    if len(rate_limits[key]) >= RATE_LIMIT:
-        return False
     # Per IP global
-    rate_limits[ip] = [t for t in rate_limits[ip] if now - t < 3600]
-    if len(rate_limits[ip]) >= RATE_LIMIT_GLOBAL:
+    ip_tokens = _refill(ip, RATE_LIMIT_GLOBAL, now)
+    if ip_tokens < len(wallets):
         return False
+    # Per IP+wallet
+    wallet_tokens = {}
+    for wallet in wallets:
+        key = (ip, wallet)
+        tokens = _refill(key, RATE_LIMIT, now)
+        if tokens < 1:
+            return False
+        wallet_tokens[key] = tokens
+    rate_limits[ip] = (ip_tokens - len(wallets), now)
+    for key, tokens in wallet_tokens.items():
+        rate_limits[key] = (tokens - 1, now)
     return True
 
 
-def _record_rate_limit(ip: str, wallet: str):
-    now = time.time()
-    rate_limits[f"{ip}:{wallet}"].append(now)
-    rate_limits[ip].append(now)
+def _spawn(coro) -> asyncio.Task:
+    """Run a side effect in the background, holding a reference until it finishes."""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_done)
+    return task
+
+
+def _background_done(task: asyncio.Task):
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception():
+        logger.warning("Background task failed: %s", task.exception())
 
 
 def _get_cached(wallet: str) -> dict | None:
-    entry = roast_cache.get(wallet)
-    if entry and time.time() - entry["timestamp"] < CACHE_TTL:
-        return entry["roast"]
-    return None
+    return roast_cache.get(wallet)
 
 
 def _set_cache(wallet: str, roast: dict):
-    roast_cache[wallet] = {"roast": roast, "timestamp": time.time()}
+    roast_cache[wallet] = roast
+
+
+async def _lookup_roast(wallet: str) -> dict | None:
+    """Cached roast, falling back to the latest one in the DB (which then gets cached)."""
+    roast = _get_cached(wallet)
+    if roast:
+        return roast
+    history = await asyncio.to_thread(db.get_roast_history, wallet, limit=1)
+    if history:
+        roast = history[0]["roast"]
+        _set_cache(wallet, roast)
+        return roast
+    return None
+
+
+def _remember_recent(wallet: str, roast: dict):
+    _recent.append({
+        "wallet": wallet,
+        "title": roast.get("title", ""),
+        "degen_score": roast.get("degen_score", 0),
+        "summary": roast.get("summary", ""),
+        "created_at": time.time(),
+    })
+
+
+async def _reaper():
+    """Evict expired roasts and idle rate-limit buckets so memory stays bounded."""
+    while True:
+        await asyncio.sleep(REAP_INTERVAL)
+        roast_cache.expire()
+        rate_limits.expire()
+
+
+def _set_score_distribution(rows: list[tuple[float | None, int]]):
+    global _score_dist
+    values, below = [], [0]
+    for score, count in sorted((s, n) for s, n in rows if isinstance(s, (int, float))):
+        values.append(score)
+        below.append(below[-1] + count)
+    _score_dist = (values, below, sum(n for _, n in rows))
+
+
+async def _score_refresher():
+    """Reload the score distribution so percentiles never hit the DB per request."""
+    while True:
+        try:
+            _set_score_distribution(await asyncio.to_thread(db.get_score_distribution))
+        except Exception as e:
+            logger.warning("Score distribution refresh failed: %s", e)
+        await asyncio.sleep(PERCENTILE_REFRESH)
+
+
+def _percentile(score: int) -> float:
+    """Same result as db.get_percentile, from the last loaded distribution."""
+    values, below, total = _score_dist
+    if not total:
+        return 50.0
+    return round(below[bisect_left(values, score)] / total * 100, 1)
+
+
+@lru_cache(maxsize=4096)
+def _wallet_error(wallet: str) -> str | None:
+    """Why a stripped address is invalid, or None. Memoized since the same wallets repeat in bursts."""
+    if len(wallet) < 32 or len(wallet) > 44:
+        return "Invalid Solana wallet address — wrong length"
+    if not _is_base58(wallet):
+        return "Invalid Solana wallet address"
+    return None
+
+
+def _persona(persona: str) -> str:
+    """Known persona id (case-insensitive), else the default; roast cache keys use this."""
+    persona = persona.strip().lower()
+    return persona if persona in PERSONAS else "degen"
 
 
 def _validate_wallet(wallet: str) -> str:
     wallet = wallet.strip()
-    if len(wallet) < 32 or len(wallet) > 44:
-        raise HTTPException(status_code=400, detail="Invalid Solana wallet address — wrong length")
-    if not WALLET_RE.match(wallet):
-        raise HTTPException(status_code=400, detail="Invalid Solana wallet address")
+    error = _wallet_error(wallet)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
     return wallet
 
 
+@lru_cache(maxsize=4096)
+def _wallet_hash(wallet: str) -> str:
+    """Short anonymized wallet id for analytics."""
+    return hashlib.sha256(wallet.encode()).hexdigest()[:12]
+
+
+def _log_tracebacks() -> bool:
+    """Sentry already records tracebacks; only format them into logs without it or when debugging."""
+    return not SENTRY_DSN or logger.isEnabledFor(logging.DEBUG)
+
+
+_funny_choice = random.choice
+
+
 def _funny_error() -> str:
-    import random
-    return random.choice(FUNNY_ERRORS)
+    return _funny_choice(FUNNY_ERRORS)
 
 
 # --- Routes ---
 
 
-def _compute_achievements(roast: dict, analysis: dict) -> list:
+def _compute_achievements(roast: dict, analysis: dict | None) -> list:
     """Compute fun achievement badges based on wallet traits."""
     achievements = []
     stats = roast.get("wallet_stats", {})
@@ -258,51 +469,89 @@ async def api_personas():
 @app.post("/api/roast")
 async def api_roast(req: RoastRequest, request: Request):
     wallet = _validate_wallet(req.wallet)
-    ip = request.client.host if request.client else "unknown"
 
     # Support ?force=true to bypass all caches
     force = request.query_params.get("force", "").lower() in ("true", "1", "yes")
 
-    if not _check_rate_limit(ip, wallet):
-        raise HTTPException(status_code=429, detail="Rate limit exceeded. Touch some grass and try again later. 🌱")
-
-    persona = req.persona if req.persona in ("degen", "gordon", "shakespeare", "drill_sergeant") else "degen"
+    persona = _persona(req.persona)
     cache_key = f"{wallet}:{persona}"
 
-    # Check cache (skip if force refresh)
+    # Check cache (skip if force refresh). Hits don't spend rate-limit tokens and
+    # go out as a ready Response so FastAPI skips jsonable_encoder.
     if not force:
         cached = _get_cached(cache_key)
         if cached:
-            return cached
+            return RoastJSONResponse(cached)
+
+    if not _consume_rate_limit(_client_ip(request), wallet):
+        raise HTTPException(status_code=429, detail="Rate limit exceeded. Touch some grass and try again later. 🌱")
 
     try:
-        # Check DB cache for analysis (saves RPC calls)
-        analysis = db.get_cached_analysis(wallet) if not force else None
-        if not analysis:
-            # Fetch wallet analysis and FairScale score in parallel
-            analysis_task = asyncio.wait_for(analyze_wallet(wallet), timeout=ROAST_TIMEOUT)
-            fairscale_task = fairscale.get_fairscore(wallet)
-            analysis, fairscale_data = await asyncio.gather(analysis_task, fairscale_task)
-            db.save_analysis(wallet, analysis)
-        else:
-            fairscale_data = await fairscale.get_fairscore(wallet)
-
-        # Persist FairScale data
-        if fairscale_data:
-            db.save_fairscale_score(wallet, fairscale_data)
-
-        roast = await asyncio.wait_for(generate_roast(analysis, fairscale_data=fairscale_data, persona=req.persona), timeout=ROAST_TIMEOUT)
+        analysis, fairscale_data, fresh_analysis = await _roast_inputs(wallet, force)
+        try:
+            async with asyncio.timeout(ROAST_TIMEOUT):
+                roast = await generate_roast(analysis, fairscale_data=fairscale_data, persona=persona,
+                                             bypass_cache=force)
+        except Exception:
+            # Keep the analysis so a retry skips the RPC calls
+            if fresh_analysis:
+                _spawn(asyncio.to_thread(db.save_analysis, wallet, fresh_analysis))
+            raise
     except asyncio.TimeoutError:
-        raise HTTPException(status_code=504, detail="Roast timed out — this wallet is too complex even for us 🕐")
+        raise HTTPException(status_code=504, detail=ROAST_TIMEOUT_DETAIL)
     except Exception as e:
-        logger.error("Roast failed for %s...%s: %s", wallet[:8], wallet[-4:], e, exc_info=True)
-        sentry_sdk.capture_exception(e)
-        sentry_sdk.set_context("wallet", {"address": wallet})
+        _report_roast_failure(wallet, e)
         raise HTTPException(status_code=500, detail=_funny_error())
 
+    return await _publish_roast(wallet, persona, roast, analysis, fairscale_data, fresh_analysis)
+
+
+async def _roast_inputs(wallet: str, force: bool = False) -> tuple[dict, dict | None, dict | None]:
+    """(analysis, FairScale data, analysis if it was fetched just now) for a new roast."""
+    # Check DB cache for analysis (saves RPC calls)
+    analysis = await asyncio.to_thread(db.get_cached_analysis, wallet) if not force else None
+    fresh_analysis = None
+    if not analysis:
+        # Fetch wallet analysis and FairScale score in parallel
+        analysis_task = asyncio.wait_for(analyze_wallet(wallet), timeout=ROAST_TIMEOUT)
+        fairscale_task = fairscale.get_fairscore(wallet)
+        analysis, fairscale_data = await asyncio.gather(analysis_task, fairscale_task)
+        fresh_analysis = analysis
+    else:
+        fairscale_data = await fairscale.get_fairscore(wallet)
+
+    # Persist FairScale data
+    if fairscale_data:
+        _spawn(asyncio.to_thread(db.save_fairscale_score, wallet, fairscale_data))
+    return analysis, fairscale_data, fresh_analysis
+
+
+def _report_roast_failure(wallet: str, e: Exception):
+    logger.error("Roast failed for %s...%s: %s", wallet[:8], wallet[-4:], e, exc_info=_log_tracebacks())
+    sentry_sdk.capture_exception(e)
+    sentry_sdk.set_context("wallet", {"address": wallet})
+
+
+async def _persist_roast(wallet: str, roast: dict, fresh_analysis: dict | None):
+    """Save the roast (and the analysis it came from) before responding, so history,
+    card and share pages find it. A failed write is reported; the roast is still
+    served from the in-process caches.
+    """
+    try:
+        await asyncio.to_thread(db.commit_roast, wallet, roast, fresh_analysis)
+    except Exception as e:
+        logger.error("Saving roast for %s...%s failed: %s", wallet[:8], wallet[-4:], e, exc_info=_log_tracebacks())
+        sentry_sdk.capture_exception(e)
+
+
+async def _publish_roast(wallet: str, persona: str, roast: dict, analysis: dict,
+                         fairscale_data: dict | None, fresh_analysis: dict | None) -> dict:
+    """Decorate a freshly generated roast, then cache, track and persist it."""
+    cache_key = f"{wallet}:{persona}"
+
     # Add percentile and achievements
     score = roast.get("degen_score", 0)
-    roast["percentile"] = db.get_percentile(score)
+    roast["percentile"] = _percentile(score)
     roast["achievements"] = _compute_achievements(roast, analysis)
 
     # Add FairScale reputation data to response
@@ -317,46 +566,105 @@ async def api_roast(req: RoastRequest, request: Request):
         }
 
     _set_cache(cache_key, roast)
-    _record_rate_limit(ip, wallet)
+    # Card and share pages look roasts up by wallet alone; point them at this one
+    _set_cache(wallet, roast)
 
     # Track analytics
-    wallet_hash = hashlib.sha256(wallet.encode()).hexdigest()[:12]
-    asyncio.create_task(track_event("Wallet Submitted", {"wallet_hash": wallet_hash, "persona": persona}))
-    asyncio.create_task(track_event("Roast Generated", {"wallet_hash": wallet_hash, "degen_score": score, "persona": persona}))
+    wallet_hash = _wallet_hash(wallet)
+    track_event("Wallet Submitted", {"wallet_hash": wallet_hash, "persona": persona})
+    track_event("Roast Generated", {"wallet_hash": wallet_hash, "degen_score": score, "persona": persona})
 
-    # Persist to DB
-    db.save_roast(wallet, roast)
-
-    # Update stats (legacy file-based)
-    stats = _load_stats()
-    stats["total_roasts"] = stats.get("total_roasts", 0) + 1
-    stats["wallets"][wallet] = stats["wallets"].get(wallet, 0) + 1
-    _save_stats(stats)
+    await _persist_roast(wallet, roast, fresh_analysis)
+    _remember_recent(wallet, roast)
 
     return roast
 
 
+def _sse(event: str, data) -> bytes:
+    payload = orjson.dumps(data, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return b"event: " + event.encode() + b"\ndata: " + payload + b"\n\n"
+
+
+@app.get("/api/roast/{wallet}/stream")
+async def api_roast_stream(wallet: str, request: Request, persona: str = "degen"):
+    """Server-sent events: `token` events carry the roast text as the model writes it,
+    then a single `roast` event carries the finished roast (or an `error` event the detail).
+    """
+    wallet = _validate_wallet(wallet)
+    persona = _persona(persona)
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+    cached = _get_cached(f"{wallet}:{persona}")
+    if cached:
+        return StreamingResponse(iter([_sse("roast", cached)]), media_type="text/event-stream", headers=headers)
+
+    if not _consume_rate_limit(_client_ip(request), wallet):
+        raise HTTPException(status_code=429, detail="Rate limit exceeded. Touch some grass and try again later. 🌱")
+
+    async def events():
+        try:
+            analysis, fairscale_data, fresh_analysis = await _roast_inputs(wallet)
+            # The deadline covers the whole roast, but each wait is timed on its own so a
+            # timeout can't land while a chunk is being sent (outside this generator)
+            deadline = asyncio.get_running_loop().time() + ROAST_TIMEOUT
+            parts = stream_roast(analysis, fairscale_data=fairscale_data, persona=persona)
+            try:
+                while True:
+                    try:
+                        async with asyncio.timeout_at(deadline):
+                            part = await anext(parts)
+                    except StopAsyncIteration:
+                        break
+                    if isinstance(part, str):
+                        yield _sse("token", part)
+                    else:
+                        roast = part
+            except Exception:
+                if fresh_analysis:
+                    _spawn(asyncio.to_thread(db.save_analysis, wallet, fresh_analysis))
+                raise
+            finally:
+                await parts.aclose()
+        except asyncio.TimeoutError:
+            yield _sse("error", {"detail": ROAST_TIMEOUT_DETAIL})
+            return
+        except Exception as e:
+            _report_roast_failure(wallet, e)
+            yield _sse("error", {"detail": _funny_error()})
+            return
+        yield _sse("roast", await _publish_roast(wallet, persona, roast, analysis, fairscale_data, fresh_analysis))
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
+
+
 async def _get_or_generate_roast(wallet: str) -> dict:
     """Get existing roast from cache/DB or generate a new one."""
-    cached = _get_cached(wallet)
+    cached = await _lookup_roast(wallet)
     if cached:
+        # Roasts saved by other paths (e.g. Telegram) have no badges yet; compute
+        # them once and keep them on the cached dict for later hits
+        if "achievements" not in cached:
+            cached["achievements"] = _compute_achievements(cached, None)
         return cached
-    history = db.get_roast_history(wallet, limit=1)
-    if history:
-        roast = history[0]["roast"]
-        _set_cache(wallet, roast)
-        return roast
     # Generate fresh
-    analysis = db.get_cached_analysis(wallet)
+    analysis = await asyncio.to_thread(db.get_cached_analysis, wallet)
+    fresh_analysis = None
     if not analysis:
-        analysis = await asyncio.wait_for(analyze_wallet(wallet), timeout=ROAST_TIMEOUT)
-        db.save_analysis(wallet, analysis)
-    roast = await asyncio.wait_for(generate_roast(analysis), timeout=ROAST_TIMEOUT)
+        async with asyncio.timeout(ROAST_TIMEOUT):
+            analysis = fresh_analysis = await analyze_wallet(wallet)
+    try:
+        async with asyncio.timeout(ROAST_TIMEOUT):
+            roast = await generate_roast(analysis)
+    except Exception:
+        if fresh_analysis:
+            _spawn(asyncio.to_thread(db.save_analysis, wallet, fresh_analysis))
+        raise
     score = roast.get("degen_score", 0)
-    roast["percentile"] = db.get_percentile(score)
+    roast["percentile"] = _percentile(score)
     roast["achievements"] = _compute_achievements(roast, analysis)
     _set_cache(wallet, roast)
-    db.save_roast(wallet, roast)
+    await _persist_roast(wallet, roast, fresh_analysis)
+    _remember_recent(wallet, roast)
     return roast
 
 
@@ -371,24 +679,17 @@ async def _generate_battle_verdict(roast1: dict, roast2: dict, wallet1: str, wal
     winner_addr = wallet1 if winner == "wallet1" else wallet2
 
     # Generate AI verdict
-    raw_key = os.environ.get("ANTHROPIC_API_KEY", "")
-    api_key = "".join(raw_key.split())
-    verdict_text = ""
-    if api_key:
-        try:
-            client = anthropic.AsyncAnthropic(api_key=api_key)
-            msg = await client.messages.create(
-                model="claude-3-5-haiku-20241022",
-                max_tokens=200,
-                system="You are the Solana Roast Bot. Give a 2-sentence battle verdict comparing two wallets. Be savage, funny, and specific. Reference the stats.",
-                messages=[{"role": "user", "content": f"""Battle verdict needed:
+    try:
+        verdict_text = await complete_text(
+            system="You are the Solana Roast Bot. Give a 2-sentence battle verdict comparing two wallets. Be savage, funny, and specific. Reference the stats.",
+            prompt=f"""Battle verdict needed:
 Wallet 1 ({wallet1[:8]}...): degen score {score1}, {s1.get('sol_balance', 0)} SOL, {s1.get('token_count', 0)} tokens, {s1.get('failure_rate', 0)}% fail rate, {s1.get('swap_count', 0)} swaps, title: "{roast1.get('title', '')}"
 Wallet 2 ({wallet2[:8]}...): degen score {score2}, {s2.get('sol_balance', 0)} SOL, {s2.get('token_count', 0)} tokens, {s2.get('failure_rate', 0)}% fail rate, {s2.get('swap_count', 0)} swaps, title: "{roast2.get('title', '')}"
-Winner: Wallet {'1' if winner == 'wallet1' else '2'}. Give exactly 2 sentences. No JSON, just plain text."""}],
-            )
-            verdict_text = msg.content[0].text.strip()
-        except Exception:
-            verdict_text = f"With a degen score of {max(score1, score2)}, the winner is clearly more unhinged. The loser should probably just stake SOL and call it a day."
+Winner: Wallet {'1' if winner == 'wallet1' else '2'}. Give exactly 2 sentences. No JSON, just plain text.""",
+            max_tokens=200,
+        ) or ""
+    except Exception:
+        verdict_text = f"With a degen score of {max(score1, score2)}, the winner is clearly more unhinged. The loser should probably just stake SOL and call it a day."
 
     return {
         "winner": winner,
@@ -413,8 +714,8 @@ async def api_battle(req: BattleRequest, request: Request):
     if wallet1 == wallet2:
         raise HTTPException(status_code=400, detail="Can't battle yourself, ser. Use two different wallets.")
 
-    ip = request.client.host if request.client else "unknown"
-    if not _check_rate_limit(ip, wallet1) or not _check_rate_limit(ip, wallet2):
+    ip = _client_ip(request)
+    if not _consume_rate_limit(ip, wallet1, wallet2):
         raise HTTPException(status_code=429, detail="Rate limit exceeded. Touch some grass and try again later. 🌱")
 
     try:
@@ -425,19 +726,16 @@ async def api_battle(req: BattleRequest, request: Request):
     except asyncio.TimeoutError:
         raise HTTPException(status_code=504, detail="Battle timed out — these wallets are too complex 🕐")
     except Exception as e:
-        logger.error("Battle failed: %s", e, exc_info=True)
+        logger.error("Battle failed: %s", e, exc_info=_log_tracebacks())
         sentry_sdk.capture_exception(e)
         raise HTTPException(status_code=500, detail=_funny_error())
 
-    _record_rate_limit(ip, wallet1)
-    _record_rate_limit(ip, wallet2)
-
     battle_summary = await _generate_battle_verdict(roast1, roast2, wallet1, wallet2)
 
-    asyncio.create_task(track_event("Battle Started", {
-        "wallet1_hash": hashlib.sha256(wallet1.encode()).hexdigest()[:12],
-        "wallet2_hash": hashlib.sha256(wallet2.encode()).hexdigest()[:12],
-    }))
+    track_event("Battle Started", {
+        "wallet1_hash": _wallet_hash(wallet1),
+        "wallet2_hash": _wallet_hash(wallet2),
+    })
 
     return {
         "wallet1": wallet1,
@@ -449,45 +747,81 @@ async def api_battle(req: BattleRequest, request: Request):
 
 
 @app.get("/api/roast/{wallet}/image")
-async def api_roast_image(wallet: str):
+async def api_roast_image(wallet: str, request: Request):
     wallet = _validate_wallet(wallet)
-    cached = _get_cached(wallet)
-    if not cached:
-        # Try DB
-        history = db.get_roast_history(wallet, limit=1)
-        if history:
-            cached = history[0]["roast"]
+    cached = await _lookup_roast(wallet)
     if not cached:
         raise HTTPException(status_code=404, detail="Roast not found. Generate one first.")
 
-    try:
-        png = generate_card(cached, wallet)
-    except Exception:
-        raise HTTPException(status_code=500, detail="Card generation failed")
+    # WebP is smaller; browsers advertise it, while link-preview crawlers get
+    # PNG unless they ask. ?format=png|webp overrides.
+    fmt = request.query_params.get("format", "").upper()
+    if fmt not in ("PNG", "WEBP"):
+        fmt = "WEBP" if "image/webp" in request.headers.get("accept", "") else "PNG"
+
+    # Reuse the render while the same roast object is cached; a new roast re-renders
+    hit = _card_cache.get((wallet, fmt))
+    if hit and hit[0] is cached:
+        image, etag = hit[1], hit[2]
+    else:
+        try:
+            image = await asyncio.get_running_loop().run_in_executor(_card_pool, generate_card, cached, wallet, fmt)
+        except Exception:
+            raise HTTPException(status_code=500, detail="Card generation failed")
+        etag = f'"{hashlib.blake2b(image, digest_size=16).hexdigest()}"'
+        _card_cache[(wallet, fmt)] = (cached, image, etag)
 
-    return Response(content=png, media_type="image/png")
+    headers = {"Cache-Control": OG_CACHE_CONTROL, "ETag": etag, "Vary": "Accept"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=image, media_type=f"image/{fmt.lower()}", headers=headers)
 
 
 @app.get("/api/stats")
 async def api_stats():
-    return db.get_stats()
+    return await asyncio.to_thread(db.get_stats)
 
 
 @app.get("/api/leaderboard")
 async def api_leaderboard():
-    asyncio.create_task(track_event("Leaderboard Viewed"))
-    return db.get_leaderboard(20)
+    track_event("Leaderboard Viewed")
+    return await asyncio.to_thread(db.get_leaderboard, 20)
 
 
 @app.get("/api/recent")
 async def api_recent():
-    return db.get_recent_roasts()
+    global _recent_synced
+    now = time.time()
+    if now - _recent_synced > RECENT_RESYNC:
+        _recent_synced = now
+        rows = await asyncio.to_thread(db.get_recent_roasts, RECENT_LIMIT)
+        _merge_recent(rows)
+    return list(reversed(_recent))
+
+
+def _merge_recent(rows: list[dict]):
+    """Fold DB feed rows into _recent, keeping entries appended while they were read."""
+    merged = {}
+    for item in (*rows, *_recent):
+        merged.setdefault((item["wallet"], item["title"], item["summary"]), item)
+    newest = sorted(merged.values(), key=lambda item: item["created_at"])[-RECENT_LIMIT:]
+    _recent.clear()
+    _recent.extend(newest)
 
 
 @app.get("/api/roast/{wallet}/history")
 async def api_roast_history(wallet: str):
     wallet = _validate_wallet(wallet)
-    return db.get_roast_history(wallet)
+    return await asyncio.to_thread(db.get_roast_history, wallet)
+
+
+@app.get("/api/roast/{wallet}/cached")
+async def api_roast_cached(wallet: str, persona: str = "degen"):
+    """Cache-only roast lookup for revisits: no rate limit, no generation."""
+    cached = _get_cached(f"{_validate_wallet(wallet)}:{_persona(persona)}")
+    if not cached:
+        raise HTTPException(status_code=404, detail="Roast not cached.")
+    return RoastJSONResponse(cached)
 
 
 @app.get("/api/fairscore/{wallet}")
@@ -495,14 +829,14 @@ async def api_fairscore(wallet: str):
     """Get FairScale reputation score for a wallet."""
     wallet = _validate_wallet(wallet)
     # Check DB cache first
-    cached = db.get_fairscale_score(wallet)
+    cached = await asyncio.to_thread(db.get_fairscale_score, wallet)
     if cached and time.time() - cached.get("fetched_at", 0) < 3600:
         return cached
     # Fetch fresh
     data = await fairscale.get_fairscore(wallet)
     if not data:
         raise HTTPException(status_code=503, detail="FairScale reputation data unavailable")
-    db.save_fairscale_score(wallet, data)
+    await asyncio.to_thread(db.save_fairscale_score, wallet, data)
     return {
         "fairscore": data.get("fairscore"),
         "fairscore_base": data.get("fairscore_base"),
@@ -523,7 +857,7 @@ async def telegram_webhook(request: Request):
     from backend.telegram_bot import get_application
     from telegram import Update as TGUpdate
     tg_app = get_application()
-    data = await request.json()
+    data = orjson.loads(await request.body())
     update = TGUpdate.de_json(data, tg_app.bot)
     await tg_app.process_update(update)
     return {"ok": True}
@@ -534,7 +868,7 @@ async def telegram_setup_webhook(request: Request):
     """Set up the Telegram webhook. POST with {"url": "https://your-domain.com/api/telegram/webhook"}"""
     if not TELEGRAM_BOT_TOKEN:
         raise HTTPException(status_code=503, detail="Telegram bot not configured")
-    body = await request.json()
+    body = orjson.loads(await request.body())
     webhook_url = body.get("url")
     if not webhook_url:
         raise HTTPException(status_code=400, detail="Missing 'url' in request body")
@@ -546,67 +880,92 @@ async def telegram_setup_webhook(request: Request):
 @app.get("/api/reputation-leaderboard")
 async def api_reputation_leaderboard():
     """Top wallets by combined degen × reputation score."""
-    return db.get_reputation_leaderboard(20)
-
+    return await asyncio.to_thread(db.get_reputation_leaderboard, 20)
 
-def _og_html(wallet: str, roast: dict, base_url: str = "") -> str:
-    title = html.escape(roast.get("title", "Solana Roast Bot"))
-    summary = html.escape(roast.get("summary", "Get your Solana wallet roasted!"))
-    score = int(roast.get("degen_score", 0))
-    safe_wallet = html.escape(wallet)
 
-    return f"""<!DOCTYPE html>
+_OG_TEMPLATE = """<!DOCTYPE html>
 <html lang="en">
 <head>
 <meta charset="UTF-8">
 <meta name="viewport" content="width=device-width, initial-scale=1.0">
-<title>{title} — Solana Roast Bot 🔥</title>
-<meta property="og:title" content="{title} — Solana Roast Bot 🔥">
-<meta property="og:description" content="{summary}">
-<meta property="og:image" content="{html.escape(base_url)}/api/roast/{safe_wallet}/image">
+<title>%(title)s — Solana Roast Bot 🔥</title>
+<meta property="og:title" content="%(title)s — Solana Roast Bot 🔥">
+<meta property="og:description" content="%(summary)s">
+<meta property="og:image" content="%(base_url)s/api/roast/%(wallet)s/image">
 <meta property="og:type" content="website">
 <meta name="twitter:card" content="summary_large_image">
-<meta name="twitter:title" content="{title} — Solana Roast Bot 🔥">
-<meta name="twitter:description" content="{summary}">
-<meta name="twitter:image" content="{html.escape(base_url)}/api/roast/{safe_wallet}/image">
-<meta name="description" content="Solana wallet roast — degen score {score}/100. {summary}">
-<script>window.location.href='/?wallet={safe_wallet}';</script>
+<meta name="twitter:title" content="%(title)s — Solana Roast Bot 🔥">
+<meta name="twitter:description" content="%(summary)s">
+<meta name="twitter:image" content="%(base_url)s/api/roast/%(wallet)s/image">
+<meta name="description" content="Solana wallet roast — degen score %(score)d/100. %(summary)s">
+<script>window.location.href='/?wallet=%(wallet)s';</script>
 </head>
 <body style="background:#0a0515;color:#fff;font-family:sans-serif;padding:40px;text-align:center;">
-<h1>🔥 {title}</h1>
-<p>{summary}</p>
-<p>Degen Score: {score}/100</p>
-<p><a href="/?wallet={safe_wallet}" style="color:#ff7832;">View Full Roast →</a></p>
+<h1>🔥 %(title)s</h1>
+<p>%(summary)s</p>
+<p>Degen Score: %(score)d/100</p>
+<p><a href="/?wallet=%(wallet)s" style="color:#ff7832;">View Full Roast →</a></p>
 </body>
 </html>"""
 
 
+# Keyed on the roast fields themselves, so a regenerated roast never gets a stale page
+@lru_cache(maxsize=2048)
+def _render_og(wallet: str, title: str, summary: str, score: int, base_url: str) -> tuple[str, str]:
+    """Return the OG page and its ETag."""
+    # wallet must be Base58, so it has nothing to escape; title and
+    # summary come from the LLM and base_url from the Host header, so they do
+    if not _is_base58(wallet):
+        raise HTTPException(status_code=404)
+    page = _OG_TEMPLATE % {
+        "title": html.escape(title),
+        "summary": html.escape(summary),
+        "score": score,
+        "wallet": wallet,
+        "base_url": html.escape(base_url),
+    }
+    return page, f'"{hashlib.md5(page.encode()).hexdigest()[:16]}"'
+
+
+def _og_page(wallet: str, roast: dict, base_url: str) -> tuple[str, str]:
+    return _render_og(
+        wallet,
+        roast.get("title", "Solana Roast Bot"),
+        roast.get("summary", "Get your Solana wallet roasted!"),
+        int(roast.get("degen_score", 0)),
+        base_url,
+    )
+
+
+def _og_response(wallet: str, roast: dict, request: Request) -> Response:
+    """OG page with caching headers so CDNs and link scrapers can skip the origin."""
+    page, etag = _og_page(wallet, roast, str(request.base_url).rstrip("/"))
+    headers = {"Cache-Control": OG_CACHE_CONTROL, "ETag": etag}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(page, headers=headers)
+
+
 @app.get("/api/roast/{wallet}/og")
-async def api_roast_og_image(wallet: str):
+async def api_roast_og_image(wallet: str, request: Request):
     """Alias for the share card image (OG image for Twitter/social previews)."""
-    return await api_roast_image(wallet)
+    return await api_roast_image(wallet, request)
 
 
 @app.get("/api/roast/{wallet}", response_class=HTMLResponse)
 async def api_roast_page(wallet: str, request: Request):
     wallet = _validate_wallet(wallet)
-    cached = _get_cached(wallet)
+    cached = await _lookup_roast(wallet)
     if not cached:
-        history = db.get_roast_history(wallet, limit=1)
-        if history:
-            cached = history[0]["roast"]
-    if not cached:
-        safe = html.escape(wallet)
         return HTMLResponse(
-            f'<html><head><script>window.location.href="/?wallet={safe}";</script></head></html>'
+            f'<html><head><script>window.location.href="/?wallet={wallet}";</script></head></html>'
         )
-    base_url = str(request.base_url).rstrip("/")
-    return HTMLResponse(_og_html(wallet, cached, base_url))
+    return _og_response(wallet, cached, request)
 
 
 @app.get("/robots.txt")
 async def robots():
-    return Response(content="User-agent: *\nAllow: /\n", media_type="text/plain")
+    return Response(content=ROBOTS_TXT, media_type="text/plain", headers={"Cache-Control": "public, max-age=86400"})
 
 
 # Mount static files (serves built React app assets + images)
@@ -617,35 +976,39 @@ if (STATIC_DIR / "img").exists():
     app.mount("/img", StaticFiles(directory=str(STATIC_DIR / "img")), name="img")
 
 
-@app.get("/")
-async def index():
-    import hashlib as _hl
-    content = open(str(STATIC_DIR / "index.html"), "rb").read()
+@lru_cache(maxsize=1)
+def _index_html() -> tuple[bytes, str]:
+    """index.html and its ETag, read once since the build is baked into the image."""
+    content = (STATIC_DIR / "index.html").read_bytes()
+    return content, f'"{hashlib.md5(content).hexdigest()[:12]}"'
+
+
+def _index_response() -> Response:
+    content, etag = _index_html()
     return Response(
         content=content,
         media_type="text/html",
         headers={
             "Cache-Control": "no-cache, no-store, must-revalidate, max-age=0",
             "Pragma": "no-cache",
-            "ETag": f'"{_hl.md5(content).hexdigest()[:12]}"',
+            "ETag": etag,
         },
     )
 
 
+@app.get("/")
+async def index():
+    return _index_response()
+
+
 @app.get("/{wallet}")
 async def wallet_page(wallet: str, request: Request):
-    if wallet in ("favicon.ico", "robots.txt") or wallet.startswith("api/") or wallet.startswith("static/") or wallet.startswith("assets/") or wallet.startswith("img/"):
-        raise HTTPException(status_code=404)
-    try:
-        wallet = _validate_wallet(wallet)
-    except HTTPException:
-        raise HTTPException(status_code=404)
-    cached = _get_cached(wallet)
-    if not cached:
-        history = db.get_roast_history(wallet, limit=1)
-        if history:
-            cached = history[0]["roast"]
+    # Bots hammer this route with /.env, /wp-admin, /favicon.ico and friends.
+    # None of those are Base58 (no dots or slashes), so one cheap check covers
+    # every non-wallet path and a plain 404 skips the exception machinery.
+    if not 32 <= len(wallet) <= 44 or not _is_base58(wallet):
+        return Response(status_code=404)
+    cached = await _lookup_roast(wallet)
     if cached:
-        base_url = str(request.base_url).rstrip("/")
-        return HTMLResponse(_og_html(wallet, cached, base_url))
-    return FileResponse(str(STATIC_DIR / "index.html"))
+        return _og_response(wallet, cached, request)
+    return _index_response()
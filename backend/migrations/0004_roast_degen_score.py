@@ -0,0 +1,15 @@
+from yoyo import step
+
+steps = [
+    step(
+        """
+        ALTER TABLE roasts ADD COLUMN degen_score DOUBLE PRECISION
+            GENERATED ALWAYS AS ((roast_json::json->>'degen_score')::float) STORED
+        """,
+        "ALTER TABLE roasts DROP COLUMN degen_score"
+    ),
+    step(
+        "CREATE INDEX IF NOT EXISTS idx_roasts_score ON roasts(degen_score DESC)",
+        "DROP INDEX IF EXISTS idx_roasts_score"
+    ),
+]
@@ -0,0 +1,52 @@
+from yoyo import step
+
+steps = [
+    step(
+        """
+        CREATE TABLE IF NOT EXISTS roast_counters (
+            id INT PRIMARY KEY CHECK (id = 1),
+            total_roasts BIGINT NOT NULL,
+            unique_wallets BIGINT NOT NULL,
+            scored_roasts BIGINT NOT NULL,
+            score_sum DOUBLE PRECISION NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS seen_wallets (
+            wallet TEXT PRIMARY KEY
+        );
+        INSERT INTO seen_wallets SELECT DISTINCT wallet FROM roasts ON CONFLICT DO NOTHING;
+        INSERT INTO roast_counters
+            SELECT 1, COUNT(*), (SELECT COUNT(*) FROM seen_wallets), COUNT(degen_score), COALESCE(SUM(degen_score), 0)
+            FROM roasts
+        ON CONFLICT (id) DO NOTHING;
+        """,
+        """
+        DROP TABLE IF EXISTS seen_wallets;
+        DROP TABLE IF EXISTS roast_counters;
+        """
+    ),
+    step(
+        """
+        CREATE OR REPLACE FUNCTION count_roast() RETURNS trigger AS $$
+        DECLARE
+            new_wallet INT;
+        BEGIN
+            INSERT INTO seen_wallets (wallet) VALUES (NEW.wallet) ON CONFLICT DO NOTHING;
+            GET DIAGNOSTICS new_wallet = ROW_COUNT;
+            UPDATE roast_counters SET
+                total_roasts = total_roasts + 1,
+                unique_wallets = unique_wallets + new_wallet,
+                scored_roasts = scored_roasts + (NEW.degen_score IS NOT NULL)::int,
+                score_sum = score_sum + COALESCE(NEW.degen_score, 0)
+            WHERE id = 1;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql;
+        CREATE TRIGGER roasts_count AFTER INSERT ON roasts
+            FOR EACH ROW EXECUTE FUNCTION count_roast();
+        """,
+        """
+        DROP TRIGGER IF EXISTS roasts_count ON roasts;
+        DROP FUNCTION IF EXISTS count_roast();
+        """
+    ),
+]
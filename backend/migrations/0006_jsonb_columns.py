@@ -0,0 +1,25 @@
+from yoyo import step
+
+# degen_score is generated from roast_json, so it has to be rebuilt around the type change
+steps = [
+    step(
+        """
+        ALTER TABLE roasts DROP COLUMN degen_score;
+        ALTER TABLE roasts ALTER COLUMN roast_json TYPE JSONB USING roast_json::jsonb;
+        ALTER TABLE roasts ADD COLUMN degen_score DOUBLE PRECISION
+            GENERATED ALWAYS AS ((roast_json->>'degen_score')::float) STORED;
+        CREATE INDEX IF NOT EXISTS idx_roasts_score ON roasts(degen_score DESC);
+        """,
+        """
+        ALTER TABLE roasts DROP COLUMN degen_score;
+        ALTER TABLE roasts ALTER COLUMN roast_json TYPE TEXT USING roast_json::text;
+        ALTER TABLE roasts ADD COLUMN degen_score DOUBLE PRECISION
+            GENERATED ALWAYS AS ((roast_json::json->>'degen_score')::float) STORED;
+        CREATE INDEX IF NOT EXISTS idx_roasts_score ON roasts(degen_score DESC);
+        """
+    ),
+    step(
+        "ALTER TABLE wallet_analyses ALTER COLUMN analysis_json TYPE JSONB USING analysis_json::jsonb",
+        "ALTER TABLE wallet_analyses ALTER COLUMN analysis_json TYPE TEXT USING analysis_json::text"
+    ),
+]
@@ -0,0 +1,8 @@
+from yoyo import step
+
+steps = [
+    step(
+        "CREATE INDEX IF NOT EXISTS idx_roasts_wallet_score ON roasts(wallet, degen_score DESC NULLS LAST)",
+        "DROP INDEX IF EXISTS idx_roasts_wallet_score"
+    ),
+]
@@ -0,0 +1,16 @@
+from yoyo import step
+
+steps = [
+    step(
+        """
+        ALTER TABLE fairscale_scores
+            ALTER COLUMN badges TYPE JSONB USING badges::jsonb,
+            ALTER COLUMN features TYPE JSONB USING features::jsonb
+        """,
+        """
+        ALTER TABLE fairscale_scores
+            ALTER COLUMN badges TYPE TEXT USING badges::text,
+            ALTER COLUMN features TYPE TEXT USING features::text
+        """
+    ),
+]
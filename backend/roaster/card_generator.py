@@ -5,14 +5,22 @@ import math
 import os
 import random
 import textwrap
+from functools import lru_cache
 from pathlib import Path
 
+import numpy as np
 from PIL import Image, ImageDraw, ImageFont
 
 CARD_W, CARD_H = 1200, 630
 FONTS_DIR = Path(__file__).parent.parent / "static" / "fonts"
+# zlib level for card PNGs; 1 is several times faster than optimize=True for a few extra KB
+PNG_COMPRESS_LEVEL = int(os.environ.get("PNG_COMPRESS_LEVEL", "1"))
+# Opt-in 8-bit palette PNGs: roughly half the bytes and faster to encode, but the
+# antialiased text uses a couple of thousand colours, so quantizing is slightly lossy
+PNG_PALETTE = os.environ.get("CARD_PNG_PALETTE") == "1"
 
 
+@lru_cache(maxsize=32)
 def _font(bold: bool = False, size: int = 24) -> ImageFont.FreeTypeFont:
     name = "Inter-Bold.ttf" if bold else "Inter-Regular.ttf"
     path = FONTS_DIR / name
@@ -25,6 +33,12 @@ def _font(bold: bool = False, size: int = 24) -> ImageFont.FreeTypeFont:
     return ImageFont.load_default()
 
 
+# Load the faces generate_card uses up front so the first card doesn't pay for them.
+# Calls pass (bold, size) positionally so they hit these same cache keys.
+for _bold, _size in ((True, 40), (True, 32), (True, 28), (True, 16), (False, 20), (False, 18), (False, 14)):
+    _font(_bold, _size)
+
+
 def _truncate_wallet(wallet: str) -> str:
     if len(wallet) > 10:
         return f"{wallet[:4]}...{wallet[-4:]}"
@@ -33,25 +47,31 @@ def _truncate_wallet(wallet: str) -> str:
 
 def _draw_gradient(img: Image.Image):
     """Draw a dark purple-to-black gradient with subtle noise."""
-    draw = ImageDraw.Draw(img)
-    for y in range(CARD_H):
-        ratio = y / CARD_H
-        r = int(25 * (1 - ratio) + 8 * ratio)
-        g = int(8 * (1 - ratio) + 5 * ratio)
-        b = int(55 * (1 - ratio) + 20 * ratio)
-        draw.line([(0, y), (CARD_W, y)], fill=(r, g, b))
+    ratio = (np.arange(CARD_H) / CARD_H)[:, None]
+    top, bottom = np.array([25, 8, 55]), np.array([8, 5, 20])
+    rows = (top * (1 - ratio) + bottom * ratio).astype(np.uint8)  # truncates like int()
+    arr = np.broadcast_to(rows[:, None, :], (CARD_H, CARD_W, 3))
+    img.paste(Image.fromarray(np.ascontiguousarray(arr), "RGB"))
+
+
+def _dot_centers() -> tuple[tuple[int, int], ...]:
+    rng = random.Random(42)  # deterministic, and leaves the global random state alone
+    return tuple(
+        (cx + (i - 3) * 12, cy + (j - 3) * 12)
+        for cx, cy in [(CARD_W - 80, 80), (CARD_W - 80, CARD_H - 80)]
+        for i in range(7)
+        for j in range(7)
+        if rng.random() > 0.45
+    )
+
+
+_DOT_CENTERS = _dot_centers()
 
 
 def _draw_decorative_dots(draw: ImageDraw.Draw):
     """Draw QR-code-style decorative dots in corners."""
-    random.seed(42)  # deterministic
-    for cx, cy in [(CARD_W - 80, 80), (CARD_W - 80, CARD_H - 80)]:
-        for i in range(7):
-            for j in range(7):
-                if random.random() > 0.45:
-                    x = cx + (i - 3) * 12
-                    y = cy + (j - 3) * 12
-                    draw.ellipse([x - 3, y - 3, x + 3, y + 3], fill=(60, 30, 90, 180))
+    for x, y in _DOT_CENTERS:
+        draw.ellipse([x - 3, y - 3, x + 3, y + 3], fill=(60, 30, 90, 180))
 
 
 def _draw_score_bar(draw: ImageDraw.Draw, x: int, y: int, w: int, h: int, score: int):
@@ -68,8 +88,8 @@ def _draw_score_bar(draw: ImageDraw.Draw, x: int, y: int, w: int, h: int, score:
         draw.rounded_rectangle([x, y, x + fill_w, y + h], radius=h // 2, fill=color)
 
 
-def generate_card(roast: dict, wallet: str) -> bytes:
-    """Generate a PNG card and return bytes."""
+def _build_template() -> Image.Image:
+    """Wallet-independent part of the card: background, decorations and header."""
     img = Image.new("RGB", (CARD_W, CARD_H))
     _draw_gradient(img)
     draw = ImageDraw.Draw(img)
@@ -83,16 +103,12 @@ def generate_card(roast: dict, wallet: str) -> bytes:
         r_val = min(255, 255 - i * 10)
         draw.line([(0, i), (CARD_W, i)], fill=(r_val, 120 - i * 10, 50 - i * 5))
 
-    # Purple glow effect (subtle)
-    for i in range(20):
-        opacity = 15 - i
-        if opacity > 0:
-            draw.ellipse([CARD_W // 2 - 300 - i * 5, -100 - i * 3,
-                         CARD_W // 2 + 300 + i * 5, 100 + i * 3],
-                        fill=(80 + i, 30, 120 + i))
+    # Purple glow effect (subtle). The old 15 nested opaque ellipses each covered
+    # the last, so only the outermost one (i=14) was ever visible.
+    draw.ellipse([CARD_W // 2 - 370, -142, CARD_W // 2 + 370, 142], fill=(94, 30, 134))
 
     # Fire emojis
-    fire_font = _font(bold=True, size=40)
+    fire_font = _font(True, 40)
     for (fx, fy) in [(CARD_W - 160, 20), (CARD_W - 120, 50), (50, CARD_H - 60)]:
         try:
             draw.text((fx, fy), "🔥", font=fire_font, fill=(255, 120, 50))
@@ -100,24 +116,37 @@ def generate_card(roast: dict, wallet: str) -> bytes:
             draw.text((fx, fy), "*", font=fire_font, fill=(255, 120, 50))
 
     # Header
-    header_font = _font(bold=True, size=28)
+    header_font = _font(True, 28)
     draw.text((40, 20), "SOLANA ROAST BOT", fill=(255, 120, 50), font=header_font)
+    return img
+
+
+_BG_TEMPLATE = _build_template()
+
+
+def generate_card(roast: dict, wallet: str, fmt: str = "PNG") -> bytes:
+    """Generate a card and return the encoded bytes.
+
+    fmt is "PNG" (image/png) or "WEBP" (image/webp; lossy, about a fifth smaller).
+    """
+    img = _BG_TEMPLATE.copy()
+    draw = ImageDraw.Draw(img)
 
     # Wallet address
     wallet_font = _font(False, 18)
     draw.text((40, 58), _truncate_wallet(wallet), fill=(150, 140, 170), font=wallet_font)
 
     # Title
-    title_font = _font(bold=True, size=40)
+    title_font = _font(True, 40)
     title = roast.get("title", "Anon Degen")
     draw.text((40, 90), f'"{title}"', fill=(255, 255, 255), font=title_font)
 
     # Roast lines
     line_font = _font(False, 20)
     y_pos = 150
-    for i, line in enumerate(roast.get("roast_lines", [])[:3]):
-        wrapped = textwrap.fill(line, width=75)
-        for j, wl in enumerate(wrapped.split("\n")):
+    for line in roast.get("roast_lines", [])[:3]:
+        # wrap() gives the lines directly; "or" keeps the bullet fill() drew for empty lines
+        for j, wl in enumerate(textwrap.wrap(line, width=75) or [""]):
             prefix = "• " if j == 0 else "  "
             draw.text((50, y_pos), f"{prefix}{wl}", fill=(220, 210, 240), font=line_font)
             y_pos += 28
@@ -130,14 +159,14 @@ def generate_card(roast: dict, wallet: str) -> bytes:
     # Score background panel
     draw.rounded_rectangle([30, score_y - 10, 620, score_y + 75], radius=12, fill=(20, 10, 40))
 
-    score_font = _font(bold=True, size=32)
+    score_font = _font(True, 32)
     draw.text((45, score_y), f"DEGEN SCORE: {score}/100", fill=(255, 255, 255), font=score_font)
     _draw_score_bar(draw, 45, score_y + 42, 550, 24, score)
 
     # Stats row at bottom
     stats = roast.get("wallet_stats", {})
     stats_y = CARD_H - 55
-    stats_font = _font(bold=True, size=16)
+    stats_font = _font(True, 16)
     stats_label_font = _font(False, 14)
 
     stat_items = [
@@ -162,5 +191,10 @@ def generate_card(roast: dict, wallet: str) -> bytes:
     draw.text((CARD_W - 180, stats_y + 5), "solana-roast.bot", fill=(80, 70, 100), font=wm_font)
 
     buf = io.BytesIO()
-    img.save(buf, format="PNG", optimize=True)
+    if fmt == "WEBP":
+        img.save(buf, format="WEBP", quality=85, method=0)
+    elif PNG_PALETTE:
+        img.quantize(256, method=Image.Quantize.FASTOCTREE).save(buf, format="PNG", compress_level=PNG_COMPRESS_LEVEL)
+    else:
+        img.save(buf, format="PNG", compress_level=PNG_COMPRESS_LEVEL)
     return buf.getvalue()
@@ -1,188 +1,359 @@
 """Database layer — uses PostgreSQL if DATABASE_URL is set, otherwise SQLite."""
 
-import json
 import os
+import threading
 import time
+from contextlib import contextmanager
 from pathlib import Path
 
+import orjson
+from cachetools import TTLCache
+
 DATABASE_URL = os.environ.get("DATABASE_URL", "")
+ANALYSIS_TTL = 86400
+FAIRSCALE_TTL = 3600
+STATS_TTL = 30
+
+# In-process L1 over wallet_analyses: wallet -> (analysis, updated_at).
+# Freshness is still judged from updated_at, so hits never outlive the DB TTL.
+_analysis_cache: TTLCache = TTLCache(maxsize=10_000, ttl=ANALYSIS_TTL)
+_cache_lock = threading.Lock()
+# wallet -> get_fairscale_score() result, refreshed by save_fairscale_score
+_fairscale_cache: TTLCache = TTLCache(maxsize=10_000, ttl=FAIRSCALE_TTL)
+# get_stats() result; dropped once a local roast insert commits, other processes catch up
+# within STATS_TTL. The generation keeps a read that raced an insert from re-caching old counts.
+_stats_cache: TTLCache = TTLCache(maxsize=1, ttl=STATS_TTL)
+_stats_generation = 0
+
+
+def _dumps(obj) -> str:
+    """orjson-encode for the TEXT JSON columns; tolerant of int keys and odd types like the API."""
+    return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+def _avg_score(score_sum: float, scored: int) -> float:
+    return round(score_sum / scored, 1) if scored else 0
+
+
+def _cached_analysis(wallet: str) -> dict | None:
+    with _cache_lock:
+        hit = _analysis_cache.get(wallet)
+    if hit and (time.time() - hit[1]) < ANALYSIS_TTL:
+        return hit[0]
+    return None
+
+
+def _remember_analysis(wallet: str, analysis: dict, updated_at: float):
+    with _cache_lock:
+        _analysis_cache[wallet] = (analysis, updated_at)
+
+
+def _forget_stats():
+    global _stats_generation
+    with _cache_lock:
+        _stats_generation += 1
+        _stats_cache.clear()
+
+
+def _remember_fairscale(wallet: str, data: dict, fetched_at: float):
+    with _cache_lock:
+        _fairscale_cache[wallet] = {
+            "fairscore": data.get("fairscore"), "fairscore_base": data.get("fairscore_base"),
+            "social_score": data.get("social_score"), "tier": data.get("tier"),
+            "badges": data.get("badges", []), "features": data.get("features", {}),
+            "fetched_at": fetched_at,
+        }
+
 
 # --------------- PostgreSQL ---------------
 if DATABASE_URL:
     import psycopg2
+    import psycopg2.extensions
     import psycopg2.extras
-
-    def _get_conn():
-        conn = psycopg2.connect(DATABASE_URL, connect_timeout=5)
-        conn.autocommit = False
-        return conn
+    import psycopg2.pool
+
+    # The JSON columns are jsonb (migrations 0006, 0008); psycopg2 decodes them on fetch
+    psycopg2.extras.register_default_jsonb(globally=True, loads=orjson.loads)
+
+    # Sized to the default to_thread executor (at most 32 workers) so handlers never exhaust it
+    DB_POOL_MAX = int(os.environ.get("DB_POOL_MAX", "32"))
+    _pool: psycopg2.pool.ThreadedConnectionPool | None = None
+    _pool_lock = threading.Lock()
+
+    class _Connection(psycopg2.extensions.connection):
+        """Pooled connection that remembers which server-side statements it has prepared."""
+        prepared: frozenset = frozenset()
+
+    def _get_pool() -> psycopg2.pool.ThreadedConnectionPool:
+        global _pool
+        if _pool is None:
+            with _pool_lock:
+                if _pool is None:
+                    _pool = psycopg2.pool.ThreadedConnectionPool(
+                        1, DB_POOL_MAX, DATABASE_URL, connect_timeout=5, connection_factory=_Connection,
+                    )
+        return _pool
+
+    def _execute_prepared(cur, name: str, sql: str, params: tuple):
+        """EXECUTE a named statement, PREPAREing it once per pooled connection.
+
+        Prepared statements belong to the session and survive rollbacks.
+        """
+        conn = cur.connection
+        if name not in conn.prepared:
+            cur.execute(f"PREPARE {name} AS {sql}")
+            conn.prepared = conn.prepared | {name}
+        cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+
+    @contextmanager
+    def _conn(transaction: bool = False):
+        """Borrow a pooled connection; it goes back with no transaction open.
+
+        By default it is in autocommit, so a single statement is one round trip with no
+        BEGIN/COMMIT. Multi-statement writes pass transaction=True and commit themselves.
+        """
+        conn = _get_pool().getconn()
+        try:
+            conn.autocommit = not transaction
+            yield conn
+        finally:
+            try:
+                conn.rollback()  # ends an uncommitted transaction; no-op otherwise
+                broken = bool(conn.closed)
+            except psycopg2.Error:
+                broken = True
+            _get_pool().putconn(conn, close=broken)
 
     def init_db():
         # PostgreSQL tables are managed by yoyo-migrations (see migrate.py)
         pass
 
-    ANALYSIS_TTL = 86400
-
     def get_cached_analysis(wallet: str) -> dict | None:
-        conn = _get_conn()
-        cur = conn.cursor()
-        cur.execute("SELECT analysis_json, updated_at FROM wallet_analyses WHERE wallet = %s", (wallet,))
-        row = cur.fetchone()
-        conn.close()
+        analysis = _cached_analysis(wallet)
+        if analysis is not None:
+            return analysis
+        with _conn() as conn:
+            cur = conn.cursor()
+            _execute_prepared(
+                cur, "get_analysis", "SELECT analysis_json, updated_at FROM wallet_analyses WHERE wallet = $1", (wallet,)
+            )
+            row = cur.fetchone()
         if row and (time.time() - row[1]) < ANALYSIS_TTL:
-            return json.loads(row[0])
+            analysis = row[0]
+            _remember_analysis(wallet, analysis, row[1])
+            return analysis
         return None
 
-    def save_analysis(wallet: str, analysis: dict):
-        now = time.time()
-        conn = _get_conn()
-        cur = conn.cursor()
-        cur.execute("""
+    def _upsert_analysis(cur, wallet: str, analysis: dict, now: float):
+        analysis_json = _dumps(analysis)
+        _execute_prepared(cur, "upsert_analysis", """
             INSERT INTO wallet_analyses (wallet, analysis_json, created_at, updated_at)
-            VALUES (%s, %s, %s, %s)
-            ON CONFLICT(wallet) DO UPDATE SET analysis_json=%s, updated_at=%s
-        """, (wallet, json.dumps(analysis), now, now, json.dumps(analysis), now))
-        conn.commit()
-        conn.close()
+            VALUES ($1, $2, $3, $4)
+            ON CONFLICT(wallet) DO UPDATE SET analysis_json=excluded.analysis_json, updated_at=excluded.updated_at
+        """, (wallet, analysis_json, now, now))
+        _remember_analysis(wallet, analysis, now)
 
-    def save_roast(wallet: str, roast: dict):
-        conn = _get_conn()
-        cur = conn.cursor()
+    def _insert_roast(cur, wallet: str, roast: dict, now: float):
         persona = roast.get("persona", "degen")
-        cur.execute(
-            "INSERT INTO roasts (wallet, roast_json, created_at, persona) VALUES (%s, %s, %s, %s)",
-            (wallet, json.dumps(roast), time.time(), persona)
+        _execute_prepared(
+            cur, "insert_roast",
+            "INSERT INTO roasts (wallet, roast_json, created_at, persona) VALUES ($1, $2, $3, $4)",
+            (wallet, _dumps(roast), now, persona)
         )
-        conn.commit()
-        conn.close()
+
+    def save_analysis(wallet: str, analysis: dict):
+        with _conn() as conn:
+            _upsert_analysis(conn.cursor(), wallet, analysis, time.time())
+
+    def save_roast(wallet: str, roast: dict):
+        # The counters trigger runs inside the INSERT statement, so autocommit keeps them in step
+        with _conn() as conn:
+            _insert_roast(conn.cursor(), wallet, roast, time.time())
+        _forget_stats()
+
+    def commit_roast(wallet: str, roast: dict, analysis: dict | None = None):
+        """Save a roast and, if given, the analysis it came from in one transaction."""
+        now = time.time()
+        with _conn(transaction=True) as conn:
+            cur = conn.cursor()
+            if analysis is not None:
+                _upsert_analysis(cur, wallet, analysis, now)
+            _insert_roast(cur, wallet, roast, now)
+            conn.commit()
+        _forget_stats()
+
+    def save_roasts_bulk(rows: list[tuple[str, dict]]):
+        """Insert many (wallet, roast) pairs in one transaction, 500 rows per round trip."""
+        now = time.time()
+        with _conn(transaction=True) as conn:
+            psycopg2.extras.execute_values(
+                conn.cursor(),
+                "INSERT INTO roasts (wallet, roast_json, created_at, persona) VALUES %s",
+                [(wallet, _dumps(roast), now, roast.get("persona", "degen")) for wallet, roast in rows],
+                page_size=500,
+            )
+            conn.commit()
+        _forget_stats()
 
     def get_roast_history(wallet: str, limit: int = 10) -> list:
-        conn = _get_conn()
-        cur = conn.cursor()
-        cur.execute(
-            "SELECT roast_json, created_at FROM roasts WHERE wallet = %s ORDER BY created_at DESC LIMIT %s",
-            (wallet, limit)
-        )
-        rows = cur.fetchall()
-        conn.close()
-        return [{"roast": json.loads(r[0]), "created_at": r[1]} for r in rows]
+        with _conn() as conn:
+            cur = conn.cursor()
+            _execute_prepared(
+                cur, "roast_history",
+                "SELECT roast_json, created_at FROM roasts WHERE wallet = $1 ORDER BY created_at DESC LIMIT $2",
+                (wallet, limit)
+            )
+            rows = cur.fetchall()
+        return [{"roast": r[0], "created_at": r[1]} for r in rows]
 
     def get_recent_roasts(limit: int = 20) -> list:
-        conn = _get_conn()
-        cur = conn.cursor()
-        cur.execute(
-            "SELECT wallet, roast_json, created_at FROM roasts ORDER BY created_at DESC LIMIT %s",
-            (limit,)
-        )
-        rows = cur.fetchall()
-        conn.close()
+        with _conn() as conn:
+            cur = conn.cursor()
+            # Pull just the feed fields out in SQL instead of shipping and parsing whole roasts;
+            # -> keeps degen_score a JSON number so ints stay ints
+            _execute_prepared(cur, "recent_roasts", """
+                SELECT wallet,
+                       COALESCE(roast_json->>'title', ''),
+                       COALESCE(roast_json->'degen_score', '0'::jsonb),
+                       COALESCE(roast_json->>'summary', ''),
+                       created_at
+                FROM roasts ORDER BY created_at DESC LIMIT $1
+            """, (limit,))
+            rows = cur.fetchall()
         return [{
-            "wallet": r[0],
-            "title": json.loads(r[1]).get("title", ""),
-            "degen_score": json.loads(r[1]).get("degen_score", 0),
-            "summary": json.loads(r[1]).get("summary", ""),
-            "created_at": r[2],
+            "wallet": r[0], "title": r[1], "degen_score": r[2], "summary": r[3], "created_at": r[4],
         } for r in rows]
 
-    def get_stats() -> dict:
-        conn = _get_conn()
-        cur = conn.cursor()
-        cur.execute("SELECT COUNT(*) FROM roasts")
-        total = cur.fetchone()[0]
-        cur.execute("SELECT COUNT(DISTINCT wallet) FROM roasts")
-        unique = cur.fetchone()[0]
-        cur.execute("SELECT AVG((roast_json::json->>'degen_score')::float) FROM roasts")
-        avg_score = cur.fetchone()[0]
-        conn.close()
-        return {"total_roasts": total, "unique_wallets": unique, "avg_degen_score": round(avg_score or 0, 1)}
+    def _read_stats() -> dict:
+        # roast_counters is kept current by the roasts insert trigger (migration 0005)
+        with _conn() as conn:
+            cur = conn.cursor()
+            _execute_prepared(
+                cur, "read_stats",
+                "SELECT total_roasts, unique_wallets, scored_roasts, score_sum FROM roast_counters WHERE id = $1", (1,)
+            )
+            total, unique, scored, score_sum = cur.fetchone()
+        return {"total_roasts": total, "unique_wallets": unique, "avg_degen_score": _avg_score(score_sum, scored)}
 
     def get_leaderboard(limit: int = 10) -> list:
-        conn = _get_conn()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT DISTINCT ON (wallet) wallet, roast_json, created_at,
-                   (roast_json::json->>'degen_score')::float as score
-            FROM roasts
-            ORDER BY wallet, score DESC
-        """)
-        all_rows = cur.fetchall()
-        conn.close()
-        all_rows.sort(key=lambda r: r[3] or 0, reverse=True)
+        with _conn() as conn:
+            cur = conn.cursor()
+            # Walk idx_roasts_score from the top, keeping a row only if no other roast of the
+            # same wallet beats it (a probe on idx_roasts_wallet_score; ties go to the newest),
+            # and stop after `limit` wallets. Titles are detoasted for those rows only.
+            _execute_prepared(cur, "leaderboard", """
+                WITH best AS (
+                    SELECT r.id, r.degen_score
+                    FROM roasts r
+                    WHERE r.degen_score IS NOT NULL
+                      AND NOT EXISTS (
+                          SELECT 1 FROM roasts b
+                          WHERE b.wallet = r.wallet
+                            AND (b.degen_score > r.degen_score
+                                 OR (b.degen_score = r.degen_score AND b.id > r.id))
+                      )
+                    ORDER BY r.degen_score DESC
+                    LIMIT $1
+                )
+                SELECT r.wallet, COALESCE(r.roast_json->>'title', ''), r.created_at, r.degen_score
+                FROM best JOIN roasts r USING (id)
+                ORDER BY best.degen_score DESC
+            """, (limit,))
+            rows = cur.fetchall()
         return [{
             "wallet": r[0],
-            "title": json.loads(r[1]).get("title", ""),
+            "title": r[1],
             "degen_score": r[3],
             "created_at": r[2],
-        } for r in all_rows[:limit]]
+        } for r in rows]
 
     def get_percentile(score: int) -> float:
-        conn = _get_conn()
-        cur = conn.cursor()
-        cur.execute("SELECT COUNT(*) FROM roasts")
-        total = cur.fetchone()[0]
+        with _conn() as conn:
+            cur = conn.cursor()
+            # Total from the counters row, "below" as a range on idx_roasts_score: no full scan
+            _execute_prepared(cur, "percentile", """
+                SELECT (SELECT total_roasts FROM roast_counters WHERE id = 1),
+                       (SELECT COUNT(*) FROM roasts WHERE degen_score < $1)
+            """, (score,))
+            total, below = cur.fetchone()
         if total == 0:
-            conn.close()
             return 50.0
-        cur.execute(
-            "SELECT COUNT(*) FROM roasts WHERE (roast_json::json->>'degen_score')::float < %s",
-            (score,)
-        )
-        below = cur.fetchone()[0]
-        conn.close()
         return round((below / total) * 100, 1)
 
+    def get_score_distribution() -> list[tuple[float | None, int]]:
+        """(degen_score, roast count) pairs; score is None for roasts without one."""
+        with _conn() as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                SELECT degen_score, COUNT(*)
+                FROM roasts
+                GROUP BY degen_score
+            """)
+            rows = cur.fetchall()
+        return [(r[0], r[1]) for r in rows]
+
     def save_fairscale_score(wallet: str, data: dict):
-        conn = _get_conn()
-        cur = conn.cursor()
-        cur.execute("""
-            INSERT INTO fairscale_scores (wallet, fairscore, fairscore_base, social_score, tier, badges, features, fetched_at)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT(wallet) DO UPDATE SET
-                fairscore=%s, fairscore_base=%s, social_score=%s, tier=%s, badges=%s, features=%s, fetched_at=%s
-        """, (
-            wallet, data.get("fairscore"), data.get("fairscore_base"), data.get("social_score"),
-            data.get("tier"), json.dumps(data.get("badges", [])), json.dumps(data.get("features", {})), time.time(),
-            data.get("fairscore"), data.get("fairscore_base"), data.get("social_score"),
-            data.get("tier"), json.dumps(data.get("badges", [])), json.dumps(data.get("features", {})), time.time(),
-        ))
-        conn.commit()
-        conn.close()
-
-    def get_fairscale_score(wallet: str) -> dict | None:
-        conn = _get_conn()
-        cur = conn.cursor()
-        cur.execute("SELECT fairscore, fairscore_base, social_score, tier, badges, features, fetched_at FROM fairscale_scores WHERE wallet = %s", (wallet,))
-        row = cur.fetchone()
-        conn.close()
+        now = time.time()
+        with _conn() as conn:
+            cur = conn.cursor()
+            _execute_prepared(cur, "save_fairscale", """
+                INSERT INTO fairscale_scores (wallet, fairscore, fairscore_base, social_score, tier, badges, features, fetched_at)
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+                ON CONFLICT(wallet) DO UPDATE SET
+                    fairscore=excluded.fairscore, fairscore_base=excluded.fairscore_base,
+                    social_score=excluded.social_score, tier=excluded.tier, badges=excluded.badges,
+                    features=excluded.features, fetched_at=excluded.fetched_at
+            """, (
+                wallet, data.get("fairscore"), data.get("fairscore_base"), data.get("social_score"),
+                data.get("tier"), psycopg2.extras.Json(data.get("badges", []), dumps=_dumps),
+                psycopg2.extras.Json(data.get("features", {}), dumps=_dumps), now,
+            ))
+        _remember_fairscale(wallet, data, now)
+
+    def _read_fairscale_score(wallet: str) -> dict | None:
+        with _conn() as conn:
+            cur = conn.cursor()
+            _execute_prepared(
+                cur, "get_fairscale",
+                "SELECT fairscore, fairscore_base, social_score, tier, badges, features, fetched_at FROM fairscale_scores WHERE wallet = $1",
+                (wallet,)
+            )
+            row = cur.fetchone()
         if not row:
             return None
         return {
             "fairscore": row[0], "fairscore_base": row[1], "social_score": row[2],
-            "tier": row[3], "badges": json.loads(row[4] or "[]"), "features": json.loads(row[5] or "{}"),
+            "tier": row[3], "badges": row[4] or [], "features": row[5] or {},
             "fetched_at": row[6],
         }
 
     def get_reputation_leaderboard(limit: int = 20) -> list:
         """Top wallets by combined degen_score * fairscore."""
-        conn = _get_conn()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT r.wallet,
-                   (r.roast_json::json->>'degen_score')::float as degen,
-                   f.fairscore, f.tier,
-                   (r.roast_json::json->>'degen_score')::float * COALESCE(f.fairscore, 0) as combined
-            FROM roasts r
-            JOIN fairscale_scores f ON r.wallet = f.wallet
-            WHERE f.fairscore IS NOT NULL
-            ORDER BY combined DESC
-            LIMIT %s
-        """, (limit,))
-        rows = cur.fetchall()
-        conn.close()
+        with _conn() as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                SELECT r.wallet,
+                       r.degen_score as degen,
+                       f.fairscore, f.tier,
+                       r.degen_score * COALESCE(f.fairscore, 0) as combined
+                FROM roasts r
+                JOIN fairscale_scores f ON r.wallet = f.wallet
+                WHERE f.fairscore IS NOT NULL
+                ORDER BY combined DESC
+                LIMIT %s
+            """, (limit,))
+            rows = cur.fetchall()
         return [{
             "wallet": r[0], "degen_score": r[1], "fairscore": r[2], "tier": r[3], "combined": r[4],
         } for r in rows]
 
+    def save_telegram_roast(chat_id: int, user_id: int, username: str, wallet: str, persona: str):
+        with _conn() as conn:
+            conn.cursor().execute(
+                "INSERT INTO telegram_roasts (chat_id, user_id, username, wallet_address, persona, created_at) VALUES (%s, %s, %s, %s, %s, %s)",
+                (chat_id, user_id, username or "", wallet, persona, time.time())
+            )
+
 
 # --------------- SQLite (local dev) ---------------
 else:
@@ -190,185 +361,338 @@ else:
 
     DB_PATH = Path(os.environ.get("DB_PATH", str(Path(__file__).parent.parent.parent / "data" / "roasts.db")))
 
-    def _get_conn():
+    def _get_conn(check_same_thread: bool = True):
         DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-        conn = sqlite3.connect(str(DB_PATH))
+        # Long-lived connections, so a bigger statement cache keeps every query in this module compiled
+        conn = sqlite3.connect(str(DB_PATH), check_same_thread=check_same_thread, cached_statements=256)
         conn.row_factory = sqlite3.Row
         conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")  # safe with WAL, one fsync per checkpoint
+        conn.execute("PRAGMA temp_store=MEMORY")  # leaderboard sorts stay off disk
+        conn.execute("PRAGMA mmap_size=268435456")  # 256 MB
+        conn.execute("PRAGMA cache_size=-65536")  # 64 MB page cache instead of 2 MB
+        # Busy waits come from sqlite3.connect's timeout (5s), so no busy_timeout pragma here
         return conn
 
+    # One long-lived connection per thread (sqlite3 connections are not shareable)
+    _local = threading.local()
+
+    @contextmanager
+    def _conn():
+        """This thread's connection to DB_PATH, opened on first use."""
+        conn = getattr(_local, "conn", None)
+        if conn is None or _local.path != DB_PATH:
+            conn = _local.conn = _get_conn()
+            _local.path = DB_PATH
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()  # never leave a half-done write on the shared connection
+
+    # All writes share one connection behind a lock. SQLite only admits one writer at a
+    # time anyway; queueing here rather than in SQLite's busy handler keeps concurrent
+    # saves from failing with "database is locked", while readers keep their own connections.
+    _writer_lock = threading.Lock()
+    _writer_conn = None
+    _writer_path = None
+
+    @contextmanager
+    def _writer():
+        """The writer connection to DB_PATH, held exclusively for the block."""
+        global _writer_conn, _writer_path
+        with _writer_lock:
+            if _writer_conn is None or _writer_path != DB_PATH:
+                if _writer_conn is not None:
+                    _writer_conn.close()
+                _writer_conn = _get_conn(check_same_thread=False)
+                _writer_path = DB_PATH
+            try:
+                yield _writer_conn
+            finally:
+                if _writer_conn.in_transaction:
+                    _writer_conn.rollback()
+
     def init_db():
-        conn = _get_conn()
-        conn.executescript("""
-            CREATE TABLE IF NOT EXISTS wallet_analyses (
-                wallet TEXT PRIMARY KEY,
-                analysis_json TEXT NOT NULL,
-                created_at REAL NOT NULL,
-                updated_at REAL NOT NULL
-            );
-            CREATE TABLE IF NOT EXISTS roasts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                wallet TEXT NOT NULL,
-                roast_json TEXT NOT NULL,
-                created_at REAL NOT NULL
-            );
-            CREATE INDEX IF NOT EXISTS idx_roasts_wallet ON roasts(wallet);
-            CREATE INDEX IF NOT EXISTS idx_roasts_created ON roasts(created_at DESC);
-            CREATE TABLE IF NOT EXISTS fairscale_scores (
-                wallet TEXT PRIMARY KEY,
-                fairscore REAL,
-                fairscore_base REAL,
-                social_score REAL,
-                tier TEXT,
-                badges TEXT,
-                features TEXT,
-                fetched_at REAL NOT NULL
-            );
-        """)
-        conn.close()
-
-    ANALYSIS_TTL = 86400
+        with _writer() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS wallet_analyses (
+                    wallet TEXT PRIMARY KEY,
+                    analysis_json TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS roasts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    wallet TEXT NOT NULL,
+                    roast_json TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    persona TEXT NOT NULL DEFAULT 'degen',
+                    -- no declared type, so integer scores come back as integers
+                    degen_score GENERATED ALWAYS AS (json_extract(roast_json, '$.degen_score')) STORED
+                );
+                CREATE INDEX IF NOT EXISTS idx_roasts_wallet ON roasts(wallet);
+                CREATE INDEX IF NOT EXISTS idx_roasts_created ON roasts(created_at DESC);
+                CREATE TABLE IF NOT EXISTS fairscale_scores (
+                    wallet TEXT PRIMARY KEY,
+                    fairscore REAL,
+                    fairscore_base REAL,
+                    social_score REAL,
+                    tier TEXT,
+                    badges TEXT,
+                    features TEXT,
+                    fetched_at REAL NOT NULL
+                );
+            """)
+            # Databases created before the persona column existed
+            try:
+                conn.execute("ALTER TABLE roasts ADD COLUMN persona TEXT NOT NULL DEFAULT 'degen'")
+            except sqlite3.OperationalError:
+                pass
+            # Older databases get the score column as VIRTUAL; ALTER TABLE can't add STORED ones
+            try:
+                conn.execute(
+                    "ALTER TABLE roasts ADD COLUMN degen_score "
+                    "GENERATED ALWAYS AS (json_extract(roast_json, '$.degen_score')) VIRTUAL"
+                )
+            except sqlite3.OperationalError:
+                pass
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_roasts_score ON roasts(degen_score DESC)")
+            # Running totals for get_stats, backfilled once and then kept by a trigger
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS roast_counters (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    total_roasts INTEGER NOT NULL,
+                    unique_wallets INTEGER NOT NULL,
+                    scored_roasts INTEGER NOT NULL,
+                    score_sum REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS seen_wallets (
+                    wallet TEXT PRIMARY KEY
+                );
+                INSERT OR IGNORE INTO seen_wallets
+                    SELECT DISTINCT wallet FROM roasts WHERE NOT EXISTS (SELECT 1 FROM roast_counters);
+                INSERT OR IGNORE INTO roast_counters
+                    SELECT 1, COUNT(*), (SELECT COUNT(*) FROM seen_wallets),
+                           COUNT(degen_score), COALESCE(SUM(degen_score), 0)
+                    FROM roasts;
+                CREATE TRIGGER IF NOT EXISTS roasts_count AFTER INSERT ON roasts
+                BEGIN
+                    UPDATE roast_counters SET
+                        total_roasts = total_roasts + 1,
+                        unique_wallets = unique_wallets + (NEW.wallet NOT IN (SELECT wallet FROM seen_wallets)),
+                        scored_roasts = scored_roasts + (NEW.degen_score IS NOT NULL),
+                        score_sum = score_sum + COALESCE(NEW.degen_score, 0)
+                    WHERE id = 1;
+                    INSERT OR IGNORE INTO seen_wallets (wallet) VALUES (NEW.wallet);
+                END;
+            """)
 
     def get_cached_analysis(wallet: str) -> dict | None:
-        conn = _get_conn()
-        row = conn.execute(
-            "SELECT analysis_json, updated_at FROM wallet_analyses WHERE wallet = ?", (wallet,)
-        ).fetchone()
-        conn.close()
+        analysis = _cached_analysis(wallet)
+        if analysis is not None:
+            return analysis
+        with _conn() as conn:
+            row = conn.execute(
+                "SELECT analysis_json, updated_at FROM wallet_analyses WHERE wallet = ?", (wallet,)
+            ).fetchone()
         if row and (time.time() - row["updated_at"]) < ANALYSIS_TTL:
-            return json.loads(row["analysis_json"])
+            analysis = orjson.loads(row["analysis_json"])
+            _remember_analysis(wallet, analysis, row["updated_at"])
+            return analysis
         return None
 
-    def save_analysis(wallet: str, analysis: dict):
-        now = time.time()
-        conn = _get_conn()
+    def _upsert_analysis(conn, wallet: str, analysis: dict, now: float):
+        analysis_json = _dumps(analysis)
         conn.execute(
             """INSERT INTO wallet_analyses (wallet, analysis_json, created_at, updated_at)
                VALUES (?, ?, ?, ?)
-               ON CONFLICT(wallet) DO UPDATE SET analysis_json=?, updated_at=?""",
-            (wallet, json.dumps(analysis), now, now, json.dumps(analysis), now)
+               ON CONFLICT(wallet) DO UPDATE SET analysis_json=excluded.analysis_json, updated_at=excluded.updated_at""",
+            (wallet, analysis_json, now, now)
         )
-        conn.commit()
-        conn.close()
+        _remember_analysis(wallet, analysis, now)
 
-    def save_roast(wallet: str, roast: dict):
-        conn = _get_conn()
+    def _insert_roast(conn, wallet: str, roast: dict, now: float):
         persona = roast.get("persona", "degen")
         conn.execute(
             "INSERT INTO roasts (wallet, roast_json, created_at, persona) VALUES (?, ?, ?, ?)",
-            (wallet, json.dumps(roast), time.time(), persona)
+            (wallet, _dumps(roast), now, persona)
         )
-        conn.commit()
-        conn.close()
+
+    def save_analysis(wallet: str, analysis: dict):
+        with _writer() as conn:
+            _upsert_analysis(conn, wallet, analysis, time.time())
+            conn.commit()
+
+    def save_roast(wallet: str, roast: dict):
+        with _writer() as conn:
+            _insert_roast(conn, wallet, roast, time.time())
+            conn.commit()
+        _forget_stats()
+
+    def commit_roast(wallet: str, roast: dict, analysis: dict | None = None):
+        """Save a roast and, if given, the analysis it came from in one transaction."""
+        now = time.time()
+        with _writer() as conn:
+            if analysis is not None:
+                _upsert_analysis(conn, wallet, analysis, now)
+            _insert_roast(conn, wallet, roast, now)
+            conn.commit()
+        _forget_stats()
+
+    def save_roasts_bulk(rows: list[tuple[str, dict]]):
+        """Insert many (wallet, roast) pairs in one transaction."""
+        now = time.time()
+        with _writer() as conn:
+            conn.executemany(
+                "INSERT INTO roasts (wallet, roast_json, created_at, persona) VALUES (?, ?, ?, ?)",
+                [(wallet, _dumps(roast), now, roast.get("persona", "degen")) for wallet, roast in rows],
+            )
+            conn.commit()
+        _forget_stats()
 
     def get_roast_history(wallet: str, limit: int = 10) -> list:
-        conn = _get_conn()
-        rows = conn.execute(
-            "SELECT roast_json, created_at FROM roasts WHERE wallet = ? ORDER BY created_at DESC LIMIT ?",
-            (wallet, limit)
-        ).fetchall()
-        conn.close()
-        return [{"roast": json.loads(r["roast_json"]), "created_at": r["created_at"]} for r in rows]
+        with _conn() as conn:
+            rows = conn.execute(
+                "SELECT roast_json, created_at FROM roasts WHERE wallet = ? ORDER BY created_at DESC LIMIT ?",
+                (wallet, limit)
+            ).fetchall()
+        return [{"roast": orjson.loads(r["roast_json"]), "created_at": r["created_at"]} for r in rows]
 
     def get_recent_roasts(limit: int = 20) -> list:
-        conn = _get_conn()
-        rows = conn.execute(
-            "SELECT wallet, roast_json, created_at FROM roasts ORDER BY created_at DESC LIMIT ?",
-            (limit,)
-        ).fetchall()
-        conn.close()
-        return [{
-            "wallet": r["wallet"],
-            "title": json.loads(r["roast_json"]).get("title", ""),
-            "degen_score": json.loads(r["roast_json"]).get("degen_score", 0),
-            "summary": json.loads(r["roast_json"]).get("summary", ""),
-            "created_at": r["created_at"],
-        } for r in rows]
-
-    def get_stats() -> dict:
-        conn = _get_conn()
-        total = conn.execute("SELECT COUNT(*) as c FROM roasts").fetchone()["c"]
-        unique = conn.execute("SELECT COUNT(DISTINCT wallet) as c FROM roasts").fetchone()["c"]
-        avg_score = conn.execute(
-            "SELECT AVG(json_extract(roast_json, '$.degen_score')) as avg FROM roasts"
-        ).fetchone()["avg"]
-        conn.close()
-        return {"total_roasts": total, "unique_wallets": unique, "avg_degen_score": round(avg_score or 0, 1)}
+        with _conn() as conn:
+            # Pull just the feed fields out in SQL instead of parsing whole roasts per row
+            rows = conn.execute("""
+                SELECT wallet,
+                       COALESCE(json_extract(roast_json, '$.title'), '') as title,
+                       COALESCE(degen_score, 0) as degen_score,
+                       COALESCE(json_extract(roast_json, '$.summary'), '') as summary,
+                       created_at
+                FROM roasts ORDER BY created_at DESC LIMIT ?
+            """, (limit,)).fetchall()
+        return [dict(r) for r in rows]
+
+    def _read_stats() -> dict:
+        # roast_counters is kept current by the roasts_count trigger (see init_db)
+        with _conn() as conn:
+            row = conn.execute(
+                "SELECT total_roasts, unique_wallets, scored_roasts, score_sum FROM roast_counters WHERE id = 1"
+            ).fetchone()
+        return {
+            "total_roasts": row["total_roasts"], "unique_wallets": row["unique_wallets"],
+            "avg_degen_score": _avg_score(row["score_sum"], row["scored_roasts"]),
+        }
 
     def get_leaderboard(limit: int = 10) -> list:
-        conn = _get_conn()
-        rows = conn.execute("""
-            SELECT wallet, roast_json, created_at,
-                   json_extract(roast_json, '$.degen_score') as score
-            FROM roasts
-            ORDER BY score DESC
-            LIMIT ?
-        """, (limit,)).fetchall()
-        conn.close()
+        with _conn() as conn:
+            rows = conn.execute("""
+                SELECT wallet, COALESCE(json_extract(roast_json, '$.title'), '') as title, created_at,
+                       degen_score as score
+                FROM roasts
+                ORDER BY degen_score DESC
+                LIMIT ?
+            """, (limit,)).fetchall()
         return [{
             "wallet": r["wallet"],
-            "title": json.loads(r["roast_json"]).get("title", ""),
+            "title": r["title"],
             "degen_score": r["score"],
             "created_at": r["created_at"],
         } for r in rows]
 
     def get_percentile(score: int) -> float:
-        conn = _get_conn()
-        total = conn.execute("SELECT COUNT(*) as c FROM roasts").fetchone()["c"]
-        if total == 0:
-            conn.close()
-            return 50.0
-        below = conn.execute(
-            "SELECT COUNT(*) as c FROM roasts WHERE json_extract(roast_json, '$.degen_score') < ?",
-            (score,)
-        ).fetchone()["c"]
-        conn.close()
+        with _conn() as conn:
+            total = conn.execute("SELECT total_roasts FROM roast_counters WHERE id = 1").fetchone()[0]
+            if total == 0:
+                return 50.0
+            below = conn.execute(
+                "SELECT COUNT(*) as c FROM roasts WHERE degen_score < ?",
+                (score,)
+            ).fetchone()["c"]
         return round((below / total) * 100, 1)
 
+    def get_score_distribution() -> list[tuple[float | None, int]]:
+        """(degen_score, roast count) pairs; score is None for roasts without one."""
+        with _conn() as conn:
+            rows = conn.execute("""
+                SELECT degen_score as score, COUNT(*) as c
+                FROM roasts
+                GROUP BY degen_score
+            """).fetchall()
+        return [(r["score"], r["c"]) for r in rows]
+
     def save_fairscale_score(wallet: str, data: dict):
-        conn = _get_conn()
-        conn.execute("""
-            INSERT INTO fairscale_scores (wallet, fairscore, fairscore_base, social_score, tier, badges, features, fetched_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(wallet) DO UPDATE SET
-                fairscore=?, fairscore_base=?, social_score=?, tier=?, badges=?, features=?, fetched_at=?
-        """, (
-            wallet, data.get("fairscore"), data.get("fairscore_base"), data.get("social_score"),
-            data.get("tier"), json.dumps(data.get("badges", [])), json.dumps(data.get("features", {})), time.time(),
-            data.get("fairscore"), data.get("fairscore_base"), data.get("social_score"),
-            data.get("tier"), json.dumps(data.get("badges", [])), json.dumps(data.get("features", {})), time.time(),
-        ))
-        conn.commit()
-        conn.close()
-
-    def get_fairscale_score(wallet: str) -> dict | None:
-        conn = _get_conn()
-        row = conn.execute("SELECT fairscore, fairscore_base, social_score, tier, badges, features, fetched_at FROM fairscale_scores WHERE wallet = ?", (wallet,)).fetchone()
-        conn.close()
+        now = time.time()
+        with _writer() as conn:
+            conn.execute("""
+                INSERT INTO fairscale_scores (wallet, fairscore, fairscore_base, social_score, tier, badges, features, fetched_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(wallet) DO UPDATE SET
+                    fairscore=excluded.fairscore, fairscore_base=excluded.fairscore_base,
+                    social_score=excluded.social_score, tier=excluded.tier, badges=excluded.badges,
+                    features=excluded.features, fetched_at=excluded.fetched_at
+            """, (
+                wallet, data.get("fairscore"), data.get("fairscore_base"), data.get("social_score"),
+                data.get("tier"), _dumps(data.get("badges", [])), _dumps(data.get("features", {})), now,
+            ))
+            conn.commit()
+        _remember_fairscale(wallet, data, now)
+
+    def _read_fairscale_score(wallet: str) -> dict | None:
+        with _conn() as conn:
+            row = conn.execute("SELECT fairscore, fairscore_base, social_score, tier, badges, features, fetched_at FROM fairscale_scores WHERE wallet = ?", (wallet,)).fetchone()
         if not row:
             return None
         return {
             "fairscore": row["fairscore"], "fairscore_base": row["fairscore_base"],
             "social_score": row["social_score"], "tier": row["tier"],
-            "badges": json.loads(row["badges"] or "[]"), "features": json.loads(row["features"] or "{}"),
+            "badges": orjson.loads(row["badges"] or "[]"), "features": orjson.loads(row["features"] or "{}"),
             "fetched_at": row["fetched_at"],
         }
 
     def get_reputation_leaderboard(limit: int = 20) -> list:
-        conn = _get_conn()
-        rows = conn.execute("""
-            SELECT r.wallet,
-                   json_extract(r.roast_json, '$.degen_score') as degen,
-                   f.fairscore, f.tier,
-                   json_extract(r.roast_json, '$.degen_score') * COALESCE(f.fairscore, 0) as combined
-            FROM roasts r
-            JOIN fairscale_scores f ON r.wallet = f.wallet
-            WHERE f.fairscore IS NOT NULL
-            ORDER BY combined DESC
-            LIMIT ?
-        """, (limit,)).fetchall()
-        conn.close()
+        with _conn() as conn:
+            rows = conn.execute("""
+                SELECT r.wallet,
+                       r.degen_score as degen,
+                       f.fairscore, f.tier,
+                       r.degen_score * COALESCE(f.fairscore, 0) as combined
+                FROM roasts r
+                JOIN fairscale_scores f ON r.wallet = f.wallet
+                WHERE f.fairscore IS NOT NULL
+                ORDER BY combined DESC
+                LIMIT ?
+            """, (limit,)).fetchall()
         return [{
             "wallet": r["wallet"], "degen_score": r["degen"], "fairscore": r["fairscore"],
             "tier": r["tier"], "combined": r["combined"],
         } for r in rows]
+
+    def save_telegram_roast(chat_id: int, user_id: int, username: str, wallet: str, persona: str):
+        # Telegram analytics are only kept in PostgreSQL
+        pass
+
+
+# --------------- In-process read caches (both backends) ---------------
+
+def get_stats() -> dict:
+    with _cache_lock:
+        stats = _stats_cache.get("stats")
+        generation = _stats_generation
+    if stats is None:
+        stats = _read_stats()
+        with _cache_lock:
+            if generation == _stats_generation:
+                _stats_cache["stats"] = stats
+    return stats
+
+
+def get_fairscale_score(wallet: str) -> dict | None:
+    with _cache_lock:
+        hit = _fairscale_cache.get(wallet)
+    if hit is not None:
+        return hit
+    row = _read_fairscale_score(wallet)
+    if row is not None:
+        with _cache_lock:
+            _fairscale_cache[wallet] = row
+    return row
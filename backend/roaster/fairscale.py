@@ -1,26 +1,50 @@
 """FairScale API client — reputation scoring for Solana wallets."""
 
+import asyncio
 import logging
 import os
 import time
 from typing import Optional
 
 import httpx
+import orjson
+from cachetools import TTLCache
 
 logger = logging.getLogger(__name__)
 
 FAIRSCALE_BASE_URL = "https://api.fairscale.xyz"
 FAIRSCALE_API_KEY = os.environ.get("FAIRSCALE_API_KEY", "")
 CACHE_TTL = 3600  # 1 hour
+STALE_TTL = 86400  # keep expired scores this long to fall back on when the API fails
 
-# In-memory hot cache
-_cache: dict[str, dict] = {}
+# In-memory hot cache; entries past CACHE_TTL are only served as a fallback
+_cache: TTLCache = TTLCache(maxsize=10_000, ttl=STALE_TTL)
+# wallet -> in-flight fetch, so concurrent callers share one request
+_inflight: dict[str, asyncio.Task] = {}
+# Shared keep-alive client, created on first use and closed by the app on shutdown
+_client: httpx.AsyncClient | None = None
 
 
 def _is_configured() -> bool:
     return bool(FAIRSCALE_API_KEY)
 
 
+def _get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            base_url=FAIRSCALE_BASE_URL, headers={"fairkey": FAIRSCALE_API_KEY}, timeout=10,
+        )
+    return _client
+
+
+async def aclose():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
 async def get_fairscore(wallet: str) -> Optional[dict]:
     """Fetch full FairScale score for a wallet. Returns None if unavailable."""
     if not _is_configured():
@@ -32,21 +56,25 @@ async def get_fairscore(wallet: str) -> Optional[dict]:
     if cached and time.time() - cached.get("_cached_at", 0) < CACHE_TTL:
         return cached
 
+    task = _inflight.get(wallet)
+    if task is None:
+        task = _inflight[wallet] = asyncio.ensure_future(_fetch_fairscore(wallet, cached))
+        task.add_done_callback(lambda _: _inflight.pop(wallet, None))
+    # shield: a caller timing out must not cancel the fetch the others are waiting on
+    return await asyncio.shield(task)
+
+
+async def _fetch_fairscore(wallet: str, cached: Optional[dict]) -> Optional[dict]:
     try:
-        async with httpx.AsyncClient(timeout=10) as client:
-            resp = await client.get(
-                f"{FAIRSCALE_BASE_URL}/score",
-                params={"wallet": wallet},
-                headers={"fairkey": FAIRSCALE_API_KEY},
-            )
-            if resp.status_code == 429:
-                logger.warning("FairScale rate limited")
-                return cached  # Return stale cache if available
-            resp.raise_for_status()
-            data = resp.json()
-            data["_cached_at"] = time.time()
-            _cache[wallet] = data
-            return data
+        resp = await _get_client().get("/score", params={"wallet": wallet})
+        if resp.status_code == 429:
+            logger.warning("FairScale rate limited")
+            return cached  # Return stale cache if available
+        resp.raise_for_status()
+        data = orjson.loads(resp.content)
+        data["_cached_at"] = time.time()
+        _cache[wallet] = data
+        return data
     except Exception as e:
         logger.error(f"FairScale API error: {e}")
         return cached  # Graceful degradation
@@ -58,49 +86,55 @@ async def get_fairscore_quick(wallet: str) -> Optional[int]:
         return None
 
     try:
-        async with httpx.AsyncClient(timeout=5) as client:
-            resp = await client.get(
-                f"{FAIRSCALE_BASE_URL}/fairScore",
-                params={"wallet": wallet},
-                headers={"fairkey": FAIRSCALE_API_KEY},
-            )
-            resp.raise_for_status()
-            return resp.json().get("fair_score")
+        resp = await _get_client().get("/fairScore", params={"wallet": wallet}, timeout=5)
+        resp.raise_for_status()
+        return orjson.loads(resp.content).get("fair_score")
     except Exception:
         return None
 
 
+_REPUTATION_HEADER = (
+    "\n--- REPUTATION DATA (FairScale) ---\n"
+    "FairScore: {fairscore} (base: {fairscore_base})\n"
+    "Social Score: {social_score}\n"
+    "Reputation Tier: {tier}"
+)
+_REPUTATION_FEATURES = "Wallet Age: {wallet_age_days} days\nActive Days: {active_days}\nTX Count: {tx_count}"
+_REPUTATION_GUIDE = (
+    "Use this reputation data to contrast with their degen behavior. "
+    "A high FairScore + high degen = 'trusted degen'. "
+    "Low FairScore + high degen = 'anonymous ape'. "
+    "High FairScore + low degen = 'boring but respectable'. "
+    "Make it funny."
+)
+
+
 def format_for_roast(data: dict) -> str:
     """Format FairScale data as context string for the AI roast prompt."""
     if not data:
         return ""
 
-    parts = [
-        f"\n--- REPUTATION DATA (FairScale) ---",
-        f"FairScore: {data.get('fairscore', 'N/A')} (base: {data.get('fairscore_base', 'N/A')})",
-        f"Social Score: {data.get('social_score', 'N/A')}",
-        f"Reputation Tier: {data.get('tier', 'unknown').upper()}",
-    ]
+    parts = [_REPUTATION_HEADER.format(
+        fairscore=data.get("fairscore", "N/A"),
+        fairscore_base=data.get("fairscore_base", "N/A"),
+        social_score=data.get("social_score", "N/A"),
+        tier=data.get("tier", "unknown").upper(),
+    )]
 
     badges = data.get("badges", [])
     if badges:
-        badge_str = ", ".join(b.get("label", b.get("id", "?")) for b in badges)
-        parts.append(f"Badges: {badge_str}")
+        parts.append("Badges: " + ", ".join(b.get("label", b.get("id", "?")) for b in badges))
 
     features = data.get("features", {})
     if features:
-        parts.append(f"Wallet Age: {features.get('wallet_age_days', '?')} days")
-        parts.append(f"Active Days: {features.get('active_days', '?')}")
-        parts.append(f"TX Count: {features.get('tx_count', '?')}")
-        if features.get("native_sol_percentile"):
-            parts.append(f"SOL Holdings Percentile: {features['native_sol_percentile']:.0%}")
-
-    parts.append(
-        "Use this reputation data to contrast with their degen behavior. "
-        "A high FairScore + high degen = 'trusted degen'. "
-        "Low FairScore + high degen = 'anonymous ape'. "
-        "High FairScore + low degen = 'boring but respectable'. "
-        "Make it funny."
-    )
-
+        parts.append(_REPUTATION_FEATURES.format(
+            wallet_age_days=features.get("wallet_age_days", "?"),
+            active_days=features.get("active_days", "?"),
+            tx_count=features.get("tx_count", "?"),
+        ))
+        sol_percentile = features.get("native_sol_percentile")
+        if sol_percentile:
+            parts.append(f"SOL Holdings Percentile: {sol_percentile:.0%}")
+
+    parts.append(_REPUTATION_GUIDE)
     return "\n".join(parts)
@@ -3,17 +3,31 @@
 import logging
 import os
 import sys
+import time
+
+
+class _SecondCachedFormatter(logging.Formatter):
+    """Formatter that runs strftime once per second instead of once per record."""
+
+    _last: tuple[int, str] = (-1, "")
+
+    def formatTime(self, record, datefmt=None):
+        second = int(record.created)
+        last = self._last
+        if last[0] != second:
+            last = self._last = (second, time.strftime(datefmt or self.datefmt, self.converter(second)))
+        return last[1]
 
 
 def setup_logging(app_name: str = "roast-bot", level: str = None):
     """Configure structured logging for the application."""
     level = level or os.environ.get("LOG_LEVEL", "INFO")
     log_format = f"%(asctime)s | %(levelname)-8s | {app_name} | %(name)s | %(message)s"
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(_SecondCachedFormatter(log_format, datefmt="%Y-%m-%d %H:%M:%S"))
     logging.basicConfig(
         level=getattr(logging, level.upper(), logging.INFO),
-        format=log_format,
-        datefmt="%Y-%m-%d %H:%M:%S",
-        stream=sys.stdout,
+        handlers=[handler],
         force=True,
     )
     # Reduce noise from libraries
@@ -1,14 +1,41 @@
 """LLM-powered roast generator using Anthropic API."""
 
-import json
+import asyncio
+import hashlib
 import logging
+import math
 import os
+import re
+from collections import ChainMap
 
 import anthropic
+import httpx
+from cachetools import TTLCache
+from pydantic import BaseModel, ConfigDict, ValidationError, field_validator
 
 logger = logging.getLogger(__name__)
 
 MODEL = "claude-3-5-haiku-20241022"
+BATCH_POLL_INTERVAL = 30  # seconds between Message Batches status checks
+# Cap on in-flight roast calls so a burst queues here instead of tripping the API rate limit
+LLM_MAX_CONCURRENCY = int(os.environ.get("ANTHROPIC_MAX_CONCURRENCY", "8"))
+# The SDK retries 429/5xx itself with exponential backoff, honouring retry-after
+LLM_MAX_RETRIES = int(os.environ.get("ANTHROPIC_MAX_RETRIES", "4"))
+_llm_slots = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+
+# Roasts by (persona, prompt digest), so re-roasting an unchanged wallet skips the API
+ROAST_CACHE_TTL = 3600
+_roast_cache: TTLCache = TTLCache(maxsize=4096, ttl=ROAST_CACHE_TTL)
+
+LOSS_CHART_TOKENS = 10  # loss_by_token entries kept in wallet_stats; sorted biggest loss first
+
+_JSON_OBJECT_RE = re.compile(r"\{.*\}", re.DOTALL)
+
+# Shared client so roasts reuse keep-alive connections to the API; rebuilt if the key changes
+_client: anthropic.AsyncAnthropic | None = None
+_client_key = ""
+CLIENT_RETIRE_DELAY = 90  # seconds; longer than the request timeout, so replaced clients close idle
+_retiring: set[asyncio.Task] = set()
 
 PERSONA_PROMPTS = {
     "degen": {
@@ -111,135 +138,225 @@ Output ONLY valid JSON:
   "summary": "One-liner for sharing (punchy, memeable)"
 }"""
 
+
+
+class RoastReply(BaseModel):
+    """The JSON_FORMAT object; parsed and type-checked in one pass. Extra keys pass through."""
+    model_config = ConfigDict(extra="allow")
+
+    title: str
+    roast_lines: list[str]
+    degen_score: int
+    score_explanation: str
+    summary: str
+
+    @field_validator("degen_score", mode="before")
+    @classmethod
+    def _round_score(cls, value):
+        """Round fractional scores (72.5) and clamp to 0-100; anything else fails the int check."""
+        if isinstance(value, (int, float, str)) and not isinstance(value, bool):
+            try:
+                score = float(value)
+            except ValueError:
+                return value
+            if math.isfinite(score):
+                return min(100, max(0, round(score)))
+        return value
+
+
 VALID_PERSONAS = set(PERSONA_PROMPTS.keys())
 
+# Composed once per persona; the identical bytes on every call also make them a cacheable prefix
+_SYSTEM_PROMPTS = {
+    pid: p["prompt"] + "\n" + ROAST_ANGLES + "\n" + JSON_FORMAT for pid, p in PERSONA_PROMPTS.items()
+}
+
+
 def _get_system_prompt(persona: str = "degen") -> str:
-    """Build the full system prompt for a given persona."""
-    if persona not in PERSONA_PROMPTS:
-        persona = "degen"
-    return PERSONA_PROMPTS[persona]["prompt"] + "\n" + ROAST_ANGLES + "\n" + JSON_FORMAT
+    """The full system prompt for a given persona."""
+    return _SYSTEM_PROMPTS.get(persona, _SYSTEM_PROMPTS["degen"])
 
 # Keep SYSTEM_PROMPT for backward compat
 SYSTEM_PROMPT = _get_system_prompt("degen")
 
 
+def _get_client() -> anthropic.AsyncAnthropic:
+    global _client, _client_key
+    raw_key = os.environ.get("ANTHROPIC_API_KEY", "")
+    api_key = "".join(raw_key.split())
+    if not api_key:
+        raise ValueError("ANTHROPIC_API_KEY not set")
+    if _client is None or api_key != _client_key:
+        if _client is not None:
+            _retire(_client)
+        _client = anthropic.AsyncAnthropic(
+            api_key=api_key,
+            max_retries=LLM_MAX_RETRIES,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(max_keepalive_connections=20, max_connections=100, keepalive_expiry=30.0),
+                timeout=httpx.Timeout(60.0, connect=10.0),
+            ),
+        )
+        _client_key = api_key
+    return _client
+
+
+def _retire(client: anthropic.AsyncAnthropic):
+    """Close a replaced client once calls already in flight on it have had time to finish."""
+    async def close_later():
+        await asyncio.sleep(CLIENT_RETIRE_DELAY)
+        await client.close()
+
+    try:
+        task = asyncio.get_running_loop().create_task(close_later())
+    except RuntimeError:
+        return  # no loop to close on; nothing async has used this client
+    _retiring.add(task)
+    task.add_done_callback(_retiring.discard)
+
+
+async def aclose():
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+# Fixed sections of the roast prompt, rendered in one format_map pass each.
+# Optional analysis keys fall back to _PROMPT_DEFAULTS.
+_PROMPT_WALLET = (
+    "WALLET DATA TO ROAST:\n\n"
+    "Wallet: {wallet}\n"
+    "SOL Balance: {sol_balance} SOL (${sol_usd})\n"
+    "SOL Price: ${sol_price}\n"
+    "Total Tokens Held: {token_count}\n"
+    "Known/Listed Tokens: {known_token_count}\n"
+    "Unknown Shitcoins: {shitcoin_count}\n"
+    "Dust Tokens (< 1 unit): {dust_tokens}"
+)
+_PROMPT_ACTIVITY = (
+    "Total Transactions: {transaction_count}\n"
+    "Failed Transactions: {failed_transactions} ({failure_rate}% failure rate)\n"
+    "Transactions Per Day (avg): {txs_per_day}\n"
+    "Late Night Txs (midnight-5AM UTC): {late_night_txs}\n"
+    "Burst Trading Sessions (5+ txs in 5 min): {burst_count}"
+)
+_PROMPT_WALLET_AGE = "Wallet Age: {wallet_age_days} days (since {first_tx_date})"
+_PROMPT_TRADING = (
+    "\nTRADING HISTORY:\n"
+    "- Estimated PnL: {estimated_pnl_sol} SOL\n"
+    "- Total Swaps Detected: {total_swaps_detected}\n"
+    "- Win Rate: {win_rate_pct}%\n"
+    "- Total SOL Volume: {total_sol_volume} SOL moved"
+)
+_PROMPT_CLOSER = "\nROAST THIS WALLET. Be savage. Be specific. Reference the exact numbers above. Give 4-6 roast lines."
+_PROMPT_DEFAULTS = {
+    "known_token_count": 0,
+    "shitcoin_count": 0,
+    "failure_rate": 0,
+    "txs_per_day": 0,
+    "late_night_txs": 0,
+    "burst_count": 0,
+    "first_tx_date": "unknown",
+    "estimated_pnl_sol": 0,
+    "total_swaps_detected": 0,
+    "total_sol_volume": 0,
+}
+
+
 def _build_prompt(analysis: dict) -> str:
     w = analysis
-    lines = ["WALLET DATA TO ROAST:\n"]
-
-    lines.append(f"Wallet: {w['wallet']}")
-    lines.append(f"SOL Balance: {w['sol_balance']} SOL (${w['sol_usd']})")
-    lines.append(f"SOL Price: ${w['sol_price']}")
-    lines.append(f"Total Tokens Held: {w['token_count']}")
-    lines.append(f"Known/Listed Tokens: {w.get('known_token_count', 0)}")
-    lines.append(f"Unknown Shitcoins: {w.get('shitcoin_count', 0)}")
-    lines.append(f"Dust Tokens (< 1 unit): {w['dust_tokens']}")
+    values = ChainMap({"win_rate_pct": round(w.get("win_rate", 0) * 100)}, w, _PROMPT_DEFAULTS)
+    parts = [_PROMPT_WALLET.format_map(values)]
 
     if w.get("top_tokens"):
         tokens_str = ", ".join(
             f"{t['symbol']}({t['amount']:.2f})" for t in w["top_tokens"][:8]
         )
-        lines.append(f"Top Tokens: {tokens_str}")
+        parts.append(f"Top Tokens: {tokens_str}")
 
-    lines.append(f"Total Transactions: {w['transaction_count']}")
-    lines.append(f"Failed Transactions: {w['failed_transactions']} ({w.get('failure_rate', 0)}% failure rate)")
-    lines.append(f"Transactions Per Day (avg): {w.get('txs_per_day', 0)}")
-    lines.append(f"Late Night Txs (midnight-5AM UTC): {w.get('late_night_txs', 0)}")
-    lines.append(f"Burst Trading Sessions (5+ txs in 5 min): {w.get('burst_count', 0)}")
+    parts.append(_PROMPT_ACTIVITY.format_map(values))
 
     if w.get("wallet_age_days"):
-        lines.append(f"Wallet Age: {w['wallet_age_days']} days (since {w.get('first_tx_date', 'unknown')})")
+        parts.append(_PROMPT_WALLET_AGE.format_map(values))
     else:
-        lines.append("Wallet Age: Unknown (possibly brand new)")
+        parts.append("Wallet Age: Unknown (possibly brand new)")
 
     if w.get("swap_count"):
-        lines.append(f"Swaps Detected (recent): {w['swap_count']}")
+        parts.append(f"Swaps Detected (recent): {w['swap_count']}")
     if w.get("protocols_used"):
-        lines.append(f"Protocols Used: {', '.join(w['protocols_used'])}")
+        parts.append(f"Protocols Used: {', '.join(w['protocols_used'])}")
     if w.get("nft_activity"):
-        lines.append(f"NFT Activity: {w['nft_activity']} NFT transactions")
+        parts.append(f"NFT Activity: {w['nft_activity']} NFT transactions")
 
     # --- Trading History ---
-    lines.append("\nTRADING HISTORY:")
-    lines.append(f"- Estimated PnL: {w.get('estimated_pnl_sol', 0)} SOL")
-    lines.append(f"- Total Swaps Detected: {w.get('total_swaps_detected', 0)}")
-    lines.append(f"- Win Rate: {round(w.get('win_rate', 0) * 100)}%")
-    lines.append(f"- Total SOL Volume: {w.get('total_sol_volume', 0)} SOL moved")
+    parts.append(_PROMPT_TRADING.format_map(values))
 
     biggest_loss = w.get("biggest_loss")
     if biggest_loss:
-        lines.append(f"- Biggest Loss: Spent {biggest_loss.get('sol_spent', '?')} SOL on {biggest_loss.get('token', '???')}, now worth ~{biggest_loss.get('current_value_sol', 0)} SOL ({biggest_loss.get('loss_pct', '?')}% loss)")
+        parts.append(f"- Biggest Loss: Spent {biggest_loss.get('sol_spent', '?')} SOL on {biggest_loss.get('token', '???')}, now worth ~{biggest_loss.get('current_value_sol', 0)} SOL ({biggest_loss.get('loss_pct', '?')}% loss)")
 
     biggest_win = w.get("biggest_win")
     if biggest_win:
-        lines.append(f"- Biggest Win: Sold {biggest_win.get('token', '???')} for {biggest_win.get('sol_received', '?')} SOL")
+        parts.append(f"- Biggest Win: Sold {biggest_win.get('token', '???')} for {biggest_win.get('sol_received', '?')} SOL")
 
     # --- Timeline ---
-    lines.append("\nTIMELINE:")
+    parts.append("\nTIMELINE:")
     joined = w.get("joined_during")
     if joined:
-        event_str = joined.get("event", "unknown times")
-        roast_str = joined.get("roast", "")
-        lines.append(f"- Joined during: {joined.get('period', '?')} — {event_str}")
-        if roast_str:
-            lines.append(f"  (Roast angle: {roast_str})")
+        parts.append(f"- Joined during: {joined.get('period', '?')} — {joined.get('event', 'unknown times')}")
+        if joined.get("roast"):
+            parts.append(f"  (Roast angle: {joined['roast']})")
 
     peak = w.get("peak_activity_period")
     if peak:
-        peak_event = peak.get("event", "no notable event")
-        lines.append(f"- Most active: {peak.get('period', '?')} ({peak.get('tx_count', 0)} txs) — {peak_event}")
+        parts.append(f"- Most active: {peak.get('period', '?')} ({peak.get('tx_count', 0)} txs) — {peak.get('event', 'no notable event')}")
 
-    gaps = w.get("inactive_gaps", [])
-    if gaps:
-        for gap in gaps[:3]:
-            missed = gap.get("event_missed", "nothing notable")
-            lines.append(f"- Inactive gap: {gap['from']} to {gap['to']} ({gap['months']} months) — missed: {missed}")
+    gaps = w.get("inactive_gaps") or []
+    parts.extend(
+        f"- Inactive gap: {gap['from']} to {gap['to']} ({gap['months']} months) — missed: {gap.get('event_missed', 'nothing notable')}"
+        for gap in gaps[:3]
+    )
 
     # --- Token Graveyard ---
     graveyard_count = w.get("graveyard_tokens", 0)
     if graveyard_count > 0:
+        parts.append(f"\nTOKEN GRAVEYARD: {graveyard_count} dead/worthless tokens")
         names = w.get("graveyard_names", [])
-        lines.append(f"\nTOKEN GRAVEYARD: {graveyard_count} dead/worthless tokens")
         if names:
-            lines.append(f"  Dead tokens: {', '.join(names[:10])}")
+            parts.append(f"  Dead tokens: {', '.join(names[:10])}")
 
     # --- Roast Angles ---
-    lines.append("\nROAST ANGLES TO USE:")
+    parts.append("\nROAST ANGLES TO USE:")
     pnl = w.get("estimated_pnl_sol", 0)
     if pnl < -1:
-        lines.append("- NET NEGATIVE trader — roast their trading skills mercilessly")
+        parts.append("- NET NEGATIVE trader — roast their trading skills mercilessly")
     elif pnl > 1:
-        lines.append("- Actually profitable — rare! Acknowledge but find other angles")
+        parts.append("- Actually profitable — rare! Acknowledge but find other angles")
 
     if joined and joined.get("sentiment") in ("top signal", "peak euphoria", "peak degen"):
-        lines.append("- BOUGHT THE TOP — classic 'buy high' energy")
+        parts.append("- BOUGHT THE TOP — classic 'buy high' energy")
 
-    if gaps:
-        for gap in gaps[:2]:
-            if gap.get("months", 0) >= 6:
-                lines.append(f"- RAGE QUIT for {gap['months']} months — paper hands confirmed")
+    parts.extend(
+        f"- RAGE QUIT for {gap['months']} months — paper hands confirmed"
+        for gap in gaps[:2] if gap.get("months", 0) >= 6
+    )
 
     if graveyard_count >= 5:
-        lines.append(f"- {graveyard_count} DEAD TOKENS — portfolio is a graveyard / museum of bad decisions")
+        parts.append(f"- {graveyard_count} DEAD TOKENS — portfolio is a graveyard / museum of bad decisions")
 
     if biggest_loss:
-        lines.append(f"- Reference the {biggest_loss.get('token', 'token')} loss specifically — make them relive it")
+        parts.append(f"- Reference the {biggest_loss.get('token', 'token')} loss specifically — make them relive it")
 
     if w.get("is_empty"):
-        lines.append("\n⚠️ THIS IS A GHOST WALLET — 0 SOL, 0 tokens, 0 transactions. Roast accordingly.")
+        parts.append("\n⚠️ THIS IS A GHOST WALLET — 0 SOL, 0 tokens, 0 transactions. Roast accordingly.")
 
-    lines.append("\nROAST THIS WALLET. Be savage. Be specific. Reference the exact numbers above. Give 4-6 roast lines.")
-    return "\n".join(lines)
+    parts.append(_PROMPT_CLOSER)
+    return "\n".join(parts)
 
 
-async def generate_roast(analysis: dict, fairscale_data: dict | None = None, persona: str = "degen") -> dict:
-    """Generate a roast from wallet analysis. Returns roast dict."""
-    raw_key = os.environ.get("ANTHROPIC_API_KEY", "")
-    api_key = "".join(raw_key.split())
-    if not api_key:
-        raise ValueError("ANTHROPIC_API_KEY not set")
-    client = anthropic.AsyncAnthropic(api_key=api_key)
-
+def _roast_request(analysis: dict, fairscale_data: dict | None, persona: str) -> tuple[str, dict]:
+    """(normalized persona, messages API arguments) for a roast."""
     prompt = _build_prompt(analysis)
 
     # Append FairScale reputation data if available
@@ -251,30 +368,124 @@ async def generate_roast(analysis: dict, fairscale_data: dict | None = None, per
         persona = "degen"
     system_prompt = _get_system_prompt(persona)
 
-    message = await client.messages.create(
-        model=MODEL,
-        max_tokens=1024,
-        system=system_prompt,
-        messages=[{"role": "user", "content": prompt}],
-    )
+    return persona, {
+        "model": MODEL,
+        "max_tokens": 1024,
+        "system": [{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}],
+        "messages": [{"role": "user", "content": prompt}],
+    }
 
-    text = message.content[0].text.strip()
-    logger.debug("LLM response length: %d chars", len(text))
 
-    if text.startswith("```"):
-        text = text.split("\n", 1)[1].rsplit("```", 1)[0].strip()
+def _roast_cache_key(persona: str, request: dict) -> tuple[str, bytes]:
+    return persona, hashlib.blake2b(request["messages"][0]["content"].encode(), digest_size=16).digest()
+
+
+async def generate_roast(analysis: dict, fairscale_data: dict | None = None, persona: str = "degen",
+                         bypass_cache: bool = False) -> dict:
+    """Generate a roast from wallet analysis. Returns roast dict.
+
+    An identical prompt within ROAST_CACHE_TTL reuses the earlier roast unless bypass_cache is set.
+    """
+    client = _get_client()
+    persona, request = _roast_request(analysis, fairscale_data, persona)
+    key = _roast_cache_key(persona, request)
+    if not bypass_cache:
+        roast = _roast_cache.get(key)
+        if roast is not None:
+            return dict(roast)
+    async with _llm_slots:
+        message = await client.messages.create(**request)
+    roast = _parse_roast(message.content[0].text, analysis, persona)
+    # Callers decorate the top level in place, so hand out copies
+    _roast_cache[key] = roast
+    return dict(roast)
+
+
+async def stream_roast(analysis: dict, fairscale_data: dict | None = None, persona: str = "degen"):
+    """Like generate_roast, but yields the model's text as it arrives, then the finished roast dict.
+
+    A roast already in the cache comes back as the dict alone, with no text first.
+    """
+    client = _get_client()
+    persona, request = _roast_request(analysis, fairscale_data, persona)
+    key = _roast_cache_key(persona, request)
+    roast = _roast_cache.get(key)
+    if roast is None:
+        async with _llm_slots, client.messages.stream(**request) as stream:
+            async for text in stream.text_stream:
+                yield text
+            message = await stream.get_final_message()
+        roast = _parse_roast(message.content[0].text, analysis, persona)
+        _roast_cache[key] = roast
+    yield dict(roast)
+
+
+async def complete_text(system: str, prompt: str, max_tokens: int) -> str | None:
+    """One-shot plain-text completion on the shared client; None if no API key is configured."""
+    try:
+        client = _get_client()
+    except ValueError:
+        return None
+    async with _llm_slots:
+        message = await client.messages.create(
+            model=MODEL,
+            max_tokens=max_tokens,
+            system=system,
+            messages=[{"role": "user", "content": prompt}],
+        )
+    return message.content[0].text.strip()
+
+
+async def generate_roasts_batch(analyses: list[dict], persona: str = "degen") -> list[dict | None]:
+    """Roast many analyses through the Message Batches API (half price, latency-insensitive).
+
+    For backfills and evals, not the request path: a batch can take minutes to hours.
+    Returns roasts in input order, with None where that request failed.
+    """
+    if not analyses:
+        return []
+    client = _get_client()
+    requests = []
+    for i, analysis in enumerate(analyses):
+        persona, params = _roast_request(analysis, None, persona)
+        requests.append({"custom_id": str(i), "params": params})
+
+    batch = await client.beta.messages.batches.create(requests=requests)
+    while batch.processing_status != "ended":
+        await asyncio.sleep(BATCH_POLL_INTERVAL)
+        batch = await client.beta.messages.batches.retrieve(batch.id)
+
+    roasts: list[dict | None] = [None] * len(analyses)
+    async for entry in await client.beta.messages.batches.results(batch.id):
+        i = int(entry.custom_id)
+        if entry.result.type != "succeeded":
+            logger.warning("Batch roast %s %s", i, entry.result.type)
+            continue
+        try:
+            roasts[i] = _parse_roast(entry.result.message.content[0].text, analyses[i], persona)
+        except ValueError:
+            pass  # already logged by _parse_roast
+    return roasts
+
+
+def _parse_roast(text: str, analysis: dict, persona: str) -> dict:
+    """Turn the model's JSON reply into a roast dict with persona and wallet stats attached."""
+    text = text.strip()
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("LLM response length: %d chars", len(text))
+
+    # Outermost {...}: drops code fences and any prose around the object
+    match = _JSON_OBJECT_RE.search(text)
+    if match:
+        text = match.group(0)
 
     try:
-        roast = json.loads(text)
-    except json.JSONDecodeError as e:
-        logger.error("Failed to parse LLM roast response: %s", e)
+        roast = RoastReply.model_validate_json(text).model_dump()
+    except ValidationError as e:
+        # One line with the reply itself; the caller owns the traceback (Sentry or its own log)
+        logger.error("Invalid LLM roast response: %s (first 500 chars: %r)", e, text[:500])
         raise
 
-    required = {"title", "roast_lines", "degen_score", "score_explanation", "summary"}
-    if not required.issubset(roast.keys()):
-        logger.error("Missing keys in roast response: %s", required - roast.keys())
-        raise ValueError(f"Missing keys: {required - roast.keys()}")
-
     roast["persona"] = persona
     roast["persona_name"] = PERSONA_PROMPTS.get(persona, {}).get("name", "Degen Roaster")
     roast["persona_icon"] = PERSONA_PROMPTS.get(persona, {}).get("icon", "🦍")
@@ -297,12 +508,10 @@ async def generate_roast(analysis: dict, fairscale_data: dict | None = None, per
         "total_sol_volume": analysis.get("total_sol_volume", 0),
         "biggest_loss": analysis.get("biggest_loss"),
         "peak_activity_period": analysis.get("peak_activity_period"),
-        # Chart data
+        # Chart data, only what the wallet autopsy draws (the loss chart shows the top 5)
         "net_worth_timeline": analysis.get("net_worth_timeline", []),
         "protocol_stats": analysis.get("protocol_stats", []),
-        "loss_by_token": analysis.get("loss_by_token", []),
-        "loss_by_period": analysis.get("loss_by_period", []),
-        "activity_heatmap": analysis.get("activity_heatmap", {}),
+        "loss_by_token": analysis.get("loss_by_token", [])[:LOSS_CHART_TOKENS],
     }
 
     return roast
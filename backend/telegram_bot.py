@@ -111,39 +111,33 @@ def _persona_keyboard(wallet: str) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(buttons)
 
 
-def _save_telegram_roast(chat_id: int, user_id: int, username: str, wallet: str, persona: str):
+async def _save_telegram_roast(chat_id: int, user_id: int, username: str, wallet: str, persona: str):
     """Save telegram roast to DB for analytics."""
     try:
-        if db.DATABASE_URL:
-            import psycopg2
-            conn = psycopg2.connect(db.DATABASE_URL, connect_timeout=5)
-            cur = conn.cursor()
-            cur.execute(
-                "INSERT INTO telegram_roasts (chat_id, user_id, username, wallet_address, persona, created_at) VALUES (%s, %s, %s, %s, %s, %s)",
-                (chat_id, user_id, username or "", wallet, persona, time.time())
-            )
-            conn.commit()
-            conn.close()
+        await asyncio.to_thread(db.save_telegram_roast, chat_id, user_id, username, wallet, persona)
     except Exception as e:
         logger.warning("Failed to save telegram roast: %s", e)
 
 
 async def _do_roast(wallet: str, persona: str) -> dict:
     """Generate a roast for the given wallet and persona."""
-    analysis = db.get_cached_analysis(wallet)
+    # DB calls go to threads so a slow database doesn't stall webhook handling
+    analysis = await asyncio.to_thread(db.get_cached_analysis, wallet)
     if not analysis:
-        analysis = await asyncio.wait_for(analyze_wallet(wallet), timeout=ROAST_TIMEOUT)
-        db.save_analysis(wallet, analysis)
+        async with asyncio.timeout(ROAST_TIMEOUT):
+            analysis = await analyze_wallet(wallet)
+        await asyncio.to_thread(db.save_analysis, wallet, analysis)
 
     fairscale_data = await fairscale.get_fairscore(wallet)
     if fairscale_data:
-        db.save_fairscale_score(wallet, fairscale_data)
+        await asyncio.to_thread(db.save_fairscale_score, wallet, fairscale_data)
 
-    roast = await asyncio.wait_for(generate_roast(analysis, fairscale_data=fairscale_data, persona=persona), timeout=ROAST_TIMEOUT)
+    async with asyncio.timeout(ROAST_TIMEOUT):
+        roast = await generate_roast(analysis, fairscale_data=fairscale_data, persona=persona)
 
     score = roast.get("degen_score", 0)
-    roast["percentile"] = db.get_percentile(score)
-    db.save_roast(wallet, roast)
+    roast["percentile"] = await asyncio.to_thread(db.get_percentile, score)
+    await asyncio.to_thread(db.save_roast, wallet, roast)
     return roast
 
 
@@ -219,7 +213,7 @@ async def cmd_roast(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     _record_rate_limit(user.id)
-    _save_telegram_roast(update.effective_chat.id, user.id, user.username, wallet, persona)
+    await _save_telegram_roast(update.effective_chat.id, user.id, user.username, wallet, persona)
 
     text = _format_roast(roast, wallet)
     keyboard = _roast_keyboard(wallet, persona)
@@ -228,7 +222,7 @@ async def cmd_roast(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 async def cmd_leaderboard(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    leaders = db.get_leaderboard(10)
+    leaders = await asyncio.to_thread(db.get_leaderboard, 10)
     if not leaders:
         await update.message.reply_text("📊 No roasts yet\\! Be the first to get roasted\\.", parse_mode=ParseMode.MARKDOWN_V2)
         return
@@ -336,7 +330,7 @@ async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return
 
         _record_rate_limit(user.id)
-        _save_telegram_roast(query.message.chat.id, user.id, user.username, wallet, persona)
+        await _save_telegram_roast(query.message.chat.id, user.id, user.username, wallet, persona)
 
         text = _format_roast(roast, wallet)
         keyboard = _roast_keyboard(wallet, persona)
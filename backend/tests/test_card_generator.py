@@ -1,4 +1,5 @@
 """Tests for card generator."""
+from backend.roaster import card_generator
 from backend.roaster.card_generator import generate_card, _truncate_wallet
 
 
@@ -20,3 +21,15 @@ def test_generate_card():
     assert len(png) > 1000
     # PNG magic bytes
     assert png[:8] == b'\x89PNG\r\n\x1a\n'
+
+
+def test_generate_card_webp():
+    webp = generate_card({"title": "T", "degen_score": 50}, "7xKXtg2CW87d97TXJSDpbD5jBkheTqA83TZRuJosgAsU", fmt="WEBP")
+    assert webp[:4] == b"RIFF" and webp[8:12] == b"WEBP"
+
+
+def test_generate_card_palette_png(monkeypatch):
+    monkeypatch.setattr(card_generator, "PNG_PALETTE", True)
+    png = generate_card({"title": "T", "degen_score": 50}, "7xKXtg2CW87d97TXJSDpbD5jBkheTqA83TZRuJosgAsU")
+    assert png[:8] == b'\x89PNG\r\n\x1a\n'
+    assert png[25] == 3  # IHDR colour type: indexed
@@ -1,5 +1,6 @@
 """Tests for the SQLite database cache layer."""
 
+import threading
 import time
 import pytest
 from unittest.mock import patch
@@ -10,6 +11,9 @@ from backend.roaster import db
 def use_temp_db(tmp_path):
     """Use a temporary database for each test."""
     test_db = tmp_path / "test_roasts.db"
+    db._analysis_cache.clear()
+    db._fairscale_cache.clear()
+    db._stats_cache.clear()
     with patch.object(db, "DB_PATH", test_db):
         db.init_db()
         yield
@@ -27,6 +31,14 @@ def test_init_db_creates_tables(tmp_path):
     assert "roasts" in names
 
 
+def test_connection_pragmas():
+    conn = db._get_conn()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA temp_store").fetchone()[0] == 2  # MEMORY
+    assert conn.execute("PRAGMA cache_size").fetchone()[0] == -65536
+    conn.close()
+
+
 def test_save_and_get_analysis():
     analysis = {"sol_balance": 42.0, "tokens": ["bonk"]}
     db.save_analysis("abc123", analysis)
@@ -75,13 +87,23 @@ def test_get_recent_roasts():
 
 
 def test_get_stats():
-    assert db.get_stats() == {"total_roasts": 0, "unique_wallets": 0}
-    db.save_roast("x", {"title": "X"})
-    db.save_roast("x", {"title": "X2"})
+    assert db.get_stats() == {"total_roasts": 0, "unique_wallets": 0, "avg_degen_score": 0}
+    db.save_roast("x", {"title": "X", "degen_score": 40})
+    db.save_roast("x", {"title": "X2", "degen_score": 61})
     db.save_roast("y", {"title": "Y"})
     stats = db.get_stats()
     assert stats["total_roasts"] == 3
     assert stats["unique_wallets"] == 2
+    assert stats["avg_degen_score"] == 50.5
+
+
+def test_stats_counters_backfill_existing_roasts():
+    db.save_roasts_bulk([("a", {"degen_score": 10}), ("b", {"degen_score": 20})])
+    with db._conn() as conn:
+        conn.executescript("DROP TABLE roast_counters; DROP TABLE seen_wallets; DROP TRIGGER roasts_count;")
+    db.init_db()
+    db.save_roast("a", {"degen_score": 30})
+    assert db.get_stats() == {"total_roasts": 3, "unique_wallets": 2, "avg_degen_score": 20.0}
 
 
 def test_no_cached_analysis_for_unknown_wallet():
@@ -90,3 +112,92 @@ def test_no_cached_analysis_for_unknown_wallet():
 
 def test_empty_roast_history():
     assert db.get_roast_history("nonexistent") == []
+
+
+def test_commit_roast_saves_analysis_and_roast():
+    db.commit_roast("w", {"title": "T", "degen_score": 50, "persona": "gordon"}, {"sol_balance": 3.0})
+    assert db.get_cached_analysis("w") == {"sol_balance": 3.0}
+    assert db.get_roast_history("w")[0]["roast"]["title"] == "T"
+
+
+def test_commit_roast_without_analysis():
+    db.commit_roast("w", {"title": "T"})
+    assert db.get_cached_analysis("w") is None
+    assert len(db.get_roast_history("w")) == 1
+
+
+def test_score_distribution():
+    for score in (10, 10, 80):
+        db.save_roast("w", {"title": "T", "degen_score": score})
+    db.save_roast("w", {"title": "no score"})
+    assert sorted(db.get_score_distribution(), key=str) == [(10, 2), (80, 1), (None, 1)]
+
+
+def test_leaderboard_uses_score_index():
+    for wallet, score in (("a", 20), ("b", 90), ("c", 55)):
+        db.save_roast(wallet, {"title": wallet, "degen_score": score})
+    db.save_roast("d", {"title": "no score"})
+    assert [r["degen_score"] for r in db.get_leaderboard(3)] == [90, 55, 20]
+    assert db.get_percentile(55) == 25.0
+    conn = db._get_conn()
+    plan = conn.execute("EXPLAIN QUERY PLAN SELECT wallet FROM roasts ORDER BY degen_score DESC LIMIT 3").fetchall()
+    conn.close()
+    assert "idx_roasts_score" in plan[0]["detail"]
+
+
+def test_analysis_served_from_memory():
+    db.save_analysis("mem", {"v": 1})
+    with db._conn() as conn:
+        conn.execute("DELETE FROM wallet_analyses")
+        conn.commit()
+    assert db.get_cached_analysis("mem") == {"v": 1}
+
+
+def test_save_roasts_bulk():
+    db.save_roasts_bulk([("a", {"title": "A"}), ("b", {"title": "B", "persona": "gordon"}), ("a", {"title": "A2"})])
+    assert db.get_stats()["total_roasts"] == 3
+    assert len(db.get_roast_history("a")) == 2
+
+
+def test_concurrent_writers_do_not_lock():
+    def worker(n):
+        for i in range(20):
+            db.save_roast(f"w{n}", {"title": "T", "degen_score": i})
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert db.get_stats()["total_roasts"] == 160
+
+
+def test_fairscale_score_cached_on_save():
+    db.save_fairscale_score("fs", {"fairscore": 7.5, "tier": "gold", "badges": ["a"]})
+    with patch.object(db, "_read_fairscale_score", side_effect=AssertionError("hit the DB")):
+        score = db.get_fairscale_score("fs")
+    assert score["fairscore"] == 7.5 and score["badges"] == ["a"] and score["features"] == {}
+    db._fairscale_cache.clear()
+    assert db.get_fairscale_score("fs")["tier"] == "gold"
+
+
+def test_stats_cached_until_roast_insert():
+    db.save_roast("a", {"degen_score": 10})
+    assert db.get_stats()["total_roasts"] == 1
+    with patch.object(db, "_read_stats", side_effect=AssertionError("hit the DB")):
+        assert db.get_stats()["total_roasts"] == 1
+    db.save_roast("b", {"degen_score": 20})
+    assert db.get_stats()["total_roasts"] == 2
+
+
+def test_stats_read_racing_an_insert_is_not_cached():
+    read_stats = db._read_stats
+
+    def read_then_insert():
+        stats = read_stats()
+        db.save_roast("late", {"degen_score": 5})  # commits after the read, before it is cached
+        return stats
+
+    with patch.object(db, "_read_stats", side_effect=read_then_insert):
+        assert db.get_stats()["total_roasts"] == 0
+    assert db.get_stats()["total_roasts"] == 1
@@ -0,0 +1,38 @@
+"""Tests for the FairScale client."""
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+
+from backend.roaster import fairscale
+
+
+@pytest.fixture(autouse=True)
+def configured():
+    fairscale._cache.clear()
+    with patch.object(fairscale, "FAIRSCALE_API_KEY", "test-key"):
+        yield
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_share_one_fetch():
+    calls = []
+
+    async def fake_fetch(wallet, cached):
+        calls.append(wallet)
+        await asyncio.sleep(0.01)
+        return {"fairscore": 5, "_cached_at": time.time()}
+
+    with patch.object(fairscale, "_fetch_fairscore", fake_fetch):
+        results = await asyncio.gather(*(fairscale.get_fairscore("w") for _ in range(10)))
+    assert calls == ["w"]
+    assert all(r["fairscore"] == 5 for r in results)
+    assert fairscale._inflight == {}
+
+
+@pytest.mark.asyncio
+async def test_fresh_cache_skips_fetch():
+    fairscale._cache["w"] = {"fairscore": 9, "_cached_at": time.time()}
+    with patch.object(fairscale, "_fetch_fairscore", side_effect=AssertionError("fetched")):
+        assert (await fairscale.get_fairscore("w"))["fairscore"] == 9
@@ -0,0 +1,126 @@
+"""Tests for the FastAPI app."""
+import asyncio
+import ipaddress
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import orjson
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+from backend import main
+
+
+def _request(peer: str, xff: str | None = None) -> Request:
+    headers = [(b"x-forwarded-for", xff.encode())] if xff else []
+    return Request({"type": "http", "client": (peer, 50000), "headers": headers})
+
+
+def test_client_ip_trusts_forwarded_for_only_from_proxies():
+    assert main._client_ip(_request("10.1.2.3", "6.6.6.6, 1.2.3.4")) == ipaddress.ip_address("1.2.3.4").packed
+    # Reached directly: a forged header must not pick the bucket
+    assert main._client_ip(_request("8.8.8.8", "1.2.3.4")) == ipaddress.ip_address("8.8.8.8").packed
+
+
+def test_client_ip_falls_back_to_peer_on_bad_header():
+    assert main._client_ip(_request("10.1.2.3", "garbage")) == ipaddress.ip_address("10.1.2.3").packed
+    assert main._client_ip(_request("10.1.2.3", "garbage")) != main._client_ip(_request("10.1.2.4", "garbage"))
+
+
+WALLET = "7xKXtg2CW87d97TXJSDpbD5jBkheTqA83TZRuJosgAsU"
+ANALYSIS = {"wallet": WALLET, "sol_balance": 1.0}
+
+
+def _roast() -> dict:
+    return {"title": "Exit Liquidity", "roast_lines": ["a", "b"], "degen_score": 70,
+            "score_explanation": "", "summary": "rekt", "wallet_stats": {}}
+
+
+@pytest.fixture
+def client():
+    main.rate_limits.clear()
+    main.roast_cache.clear()
+    main._card_cache.clear()
+    with patch.object(main, "_roast_inputs", AsyncMock(return_value=(ANALYSIS, None, None))), \
+         patch.object(main.db, "commit_roast", MagicMock()):
+        yield TestClient(main.app)
+    main.roast_cache.clear()
+    main._card_cache.clear()
+
+
+def test_roast_is_saved_before_response(client):
+    with patch.object(main, "generate_roast", AsyncMock(return_value=_roast())):
+        resp = client.post("/api/roast", json={"wallet": WALLET})
+    assert resp.status_code == 200
+    main.db.commit_roast.assert_called_once()
+    # Card and share pages find the new roast without going to the DB
+    assert main.roast_cache[WALLET]["title"] == "Exit Liquidity"
+
+
+def test_recent_merge_keeps_local_entries():
+    main._recent.clear()
+    main._remember_recent("local", _roast())
+    db_rows = [{"wallet": "tg", "title": "t", "degen_score": 1, "summary": "s", "created_at": 1.0},
+               {**main._recent[0], "created_at": 2.0}]  # the same roast as read back from the DB
+    main._merge_recent(db_rows)
+    assert [item["wallet"] for item in main._recent] == ["tg", "local"]
+    main._recent.clear()
+
+
+def test_og_page_rejects_non_base58_wallet():
+    with pytest.raises(HTTPException) as exc:
+        main._render_og('"><script>', "t", "s", 1, "https://x")
+    assert exc.value.status_code == 404
+
+
+def test_rate_limit_exhaustion_returns_429(client):
+    with patch.object(main, "RATE_LIMIT", 2), \
+         patch.object(main, "generate_roast", AsyncMock(side_effect=lambda *a, **k: _roast())):
+        codes = [client.post("/api/roast?force=true", json={"wallet": WALLET}).status_code for _ in range(3)]
+    assert codes == [200, 200, 429]
+
+
+def test_stream_sends_tokens_then_roast(client):
+    async def fake_stream(analysis, fairscale_data=None, persona="degen"):
+        yield '{"title": '
+        yield '"Exit Liquidity"}'
+        yield _roast()
+
+    with patch.object(main, "stream_roast", fake_stream):
+        resp = client.get(f"/api/roast/{WALLET}/stream")
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    events = [block.split("\n") for block in resp.text.strip().split("\n\n")]
+    assert [e[0] for e in events] == ["event: token", "event: token", "event: roast"]
+    assert orjson.loads(events[0][1].removeprefix("data: ")) == '{"title": '
+    assert orjson.loads(events[2][1].removeprefix("data: "))["title"] == "Exit Liquidity"
+
+
+def test_card_revalidation_returns_304(client):
+    main.roast_cache[WALLET] = _roast()
+    with patch.object(main, "generate_card", MagicMock(return_value=b"png-bytes")) as render:
+        first = client.get(f"/api/roast/{WALLET}/image?format=png")
+        etag = first.headers["etag"]
+        again = client.get(f"/api/roast/{WALLET}/image?format=png", headers={"If-None-Match": etag})
+    assert first.status_code == 200 and first.content == b"png-bytes"
+    assert again.status_code == 304 and again.headers["etag"] == etag and not again.content
+    render.assert_called_once()
+
+
+def test_stream_timeout_sends_error_event(client):
+    async def slow_stream(analysis, fairscale_data=None, persona="degen"):
+        yield "partial"
+        await asyncio.sleep(1)
+        yield _roast()
+
+    with patch.object(main, "ROAST_TIMEOUT", 0.2), patch.object(main, "stream_roast", slow_stream):
+        resp = client.get(f"/api/roast/{WALLET}/stream")
+    events = [block.split("\n")[0] for block in resp.text.strip().split("\n\n")]
+    assert events == ["event: token", "event: error"]
+
+
+def test_cached_lookup_normalizes_persona(client):
+    main.roast_cache[f"{WALLET}:gordon"] = {**_roast(), "title": "Gordon"}
+    main.roast_cache[f"{WALLET}:degen"] = _roast()
+    assert client.get(f"/api/roast/{WALLET}/cached?persona=Gordon").json()["title"] == "Gordon"
+    assert client.get(f"/api/roast/{WALLET}/cached?persona=nope").json()["title"] == "Exit Liquidity"
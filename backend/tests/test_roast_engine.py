@@ -1,10 +1,12 @@
 """Tests for roast engine."""
+import asyncio
 import json
 from unittest.mock import AsyncMock, patch, MagicMock
 
 import pytest
 
-from backend.roaster.roast_engine import _build_prompt, generate_roast
+from backend.roaster import roast_engine
+from backend.roaster.roast_engine import _build_prompt, generate_roast, generate_roasts_batch, stream_roast
 
 MOCK_ANALYSIS = {
     "wallet": "7xKXtg2CW87d97TXJSDpbD5jBkheTqA83TZRuJosgAsU",
@@ -48,6 +50,14 @@ def test_build_prompt_empty_wallet():
     assert "GHOST WALLET" in prompt
 
 
+@pytest.fixture(autouse=True)
+def fresh_client():
+    roast_engine._client = None
+    roast_engine._roast_cache.clear()
+    yield
+    roast_engine._client = None
+
+
 @pytest.mark.asyncio
 async def test_generate_roast():
     mock_response = MagicMock()
@@ -71,3 +81,147 @@ async def test_generate_roast():
         assert result["degen_score"] == 72
         assert "wallet_stats" in result
         assert result["wallet_stats"]["failure_rate"] == 8.5
+
+
+def test_client_reused_until_key_changes():
+    with patch.dict("os.environ", {"ANTHROPIC_API_KEY": "sk-ant-one"}):
+        first = roast_engine._get_client()
+        assert roast_engine._get_client() is first
+    with patch.dict("os.environ", {"ANTHROPIC_API_KEY": "sk-ant-two"}):
+        assert roast_engine._get_client() is not first
+
+
+@pytest.mark.asyncio
+async def test_replaced_client_is_closed():
+    with patch.object(roast_engine, "CLIENT_RETIRE_DELAY", 0):
+        with patch.dict("os.environ", {"ANTHROPIC_API_KEY": "sk-ant-one"}):
+            first = roast_engine._get_client()
+        with patch.dict("os.environ", {"ANTHROPIC_API_KEY": "sk-ant-two"}):
+            roast_engine._get_client()
+        await asyncio.gather(*roast_engine._retiring)
+    assert first.is_closed()
+    await roast_engine.aclose()
+
+
+@pytest.mark.asyncio
+async def test_stream_roast_yields_text_then_roast():
+    reply = json.dumps({
+        "title": "T", "roast_lines": ["a"], "degen_score": 50, "score_explanation": "e", "summary": "s",
+    })
+
+    async def text_stream():
+        for chunk in (reply[:10], reply[10:]):
+            yield chunk
+
+    stream = MagicMock()
+    stream.text_stream = text_stream()
+    stream.get_final_message = AsyncMock(return_value=MagicMock(content=[MagicMock(text=reply)]))
+    manager = MagicMock()
+    manager.__aenter__ = AsyncMock(return_value=stream)
+    manager.__aexit__ = AsyncMock(return_value=False)
+
+    with patch.dict("os.environ", {"ANTHROPIC_API_KEY": "sk-ant-test-key"}), \
+         patch("backend.roaster.roast_engine.anthropic.AsyncAnthropic") as mock_cls:
+        mock_cls.return_value.messages.stream = MagicMock(return_value=manager)
+        parts = [p async for p in stream_roast(MOCK_ANALYSIS, persona="gordon")]
+        # Same prompt again: served from the roast cache as a single dict, no API call
+        again = [p async for p in stream_roast(MOCK_ANALYSIS, persona="gordon")]
+
+    assert "".join(parts[:-1]) == reply
+    assert parts[-1]["title"] == "T"
+    assert parts[-1]["persona"] == "gordon"
+    assert len(again) == 1 and again[0]["title"] == "T"
+    assert mock_cls.return_value.messages.stream.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_generate_roasts_batch_keeps_input_order():
+    good = json.dumps({
+        "title": "B", "roast_lines": ["a"], "degen_score": 7, "score_explanation": "e", "summary": "s",
+    })
+
+    async def results():
+        yield MagicMock(custom_id="1", result=MagicMock(type="errored"))
+        yield MagicMock(custom_id="0", result=MagicMock(type="succeeded", message=MagicMock(content=[MagicMock(text=good)])))
+
+    with patch.dict("os.environ", {"ANTHROPIC_API_KEY": "sk-ant-test-key"}), \
+         patch("backend.roaster.roast_engine.anthropic.AsyncAnthropic") as mock_cls:
+        batches = mock_cls.return_value.beta.messages.batches
+        batches.create = AsyncMock(return_value=MagicMock(id="b1", processing_status="ended"))
+        batches.results = AsyncMock(return_value=results())
+        roasts = await generate_roasts_batch([MOCK_ANALYSIS, MOCK_ANALYSIS])
+
+    assert roasts[0]["title"] == "B" and roasts[1] is None
+    assert len(batches.create.call_args.kwargs["requests"]) == 2
+
+
+def test_parse_roast_validates_types():
+    roast = roast_engine._parse_roast(
+        '{"title": "t", "roast_lines": ["a"], "degen_score": "72", "score_explanation": "", "summary": ""}',
+        MOCK_ANALYSIS, "degen",
+    )
+    assert roast["degen_score"] == 72
+    assert roast["wallet_stats"]["sol_balance"] == 12.5
+    for score, expected in ((72.5, 72), (71.6, 72), (140, 100), (-3, 0)):
+        text = f'{{"title": "t", "roast_lines": [], "degen_score": {score}, "score_explanation": "", "summary": ""}}'
+        assert roast_engine._parse_roast(text, MOCK_ANALYSIS, "degen")["degen_score"] == expected
+
+    for bad in ('{"title": "t", "roast_lines": "a", "degen_score": 1, "score_explanation": "", "summary": ""}',
+                '{"title": "t", "roast_lines": [], "degen_score": NaN, "score_explanation": "", "summary": ""}',
+                '{"title": "t", "roast_lines": [], "degen_score": "high", "score_explanation": "", "summary": ""}',
+                '{"title": "t", "roast_lines": [], "degen_score": null, "score_explanation": "", "summary": ""}',
+                '{"title": "t", "roast_lines": []}'):
+        with pytest.raises(ValueError):
+            roast_engine._parse_roast(bad, MOCK_ANALYSIS, "degen")
+
+
+def test_wallet_stats_keep_only_drawn_chart_data():
+    analysis = {**MOCK_ANALYSIS, "loss_by_token": [{"token": f"T{i}", "sol_lost": 50 - i} for i in range(50)],
+                "activity_heatmap": {"0": {"0": 1}}, "loss_by_period": [{"period": "2024-01"}]}
+    text = '{"title": "t", "roast_lines": [], "degen_score": 1, "score_explanation": "", "summary": ""}'
+    stats = roast_engine._parse_roast(text, analysis, "degen")["wallet_stats"]
+    assert len(stats["loss_by_token"]) == roast_engine.LOSS_CHART_TOKENS
+    assert stats["loss_by_token"][0]["token"] == "T0"
+    assert "activity_heatmap" not in stats and "loss_by_period" not in stats
+
+
+def test_parse_roast_extracts_fenced_json():
+    body = '{"title": "t", "roast_lines": ["a"], "degen_score": 50, "score_explanation": "", "summary": ""}'
+    for text in (f"```json\n{body}\n```", f"Here you go:\n```\n{body}\n```\nEnjoy!", body):
+        assert roast_engine._parse_roast(text, MOCK_ANALYSIS, "degen")["degen_score"] == 50
+
+
+@pytest.mark.asyncio
+async def test_generate_roast_caches_identical_prompts():
+    mock_response = MagicMock()
+    mock_response.content = [MagicMock(text=json.dumps({
+        "title": "t", "roast_lines": ["a"], "degen_score": 40, "score_explanation": "", "summary": "",
+    }))]
+    with patch.dict("os.environ", {"ANTHROPIC_API_KEY": "sk-ant-test-key"}), \
+         patch("backend.roaster.roast_engine.anthropic.AsyncAnthropic") as mock_cls:
+        mock_client = AsyncMock()
+        mock_client.messages.create = AsyncMock(return_value=mock_response)
+        mock_cls.return_value = mock_client
+
+        first = await generate_roast(MOCK_ANALYSIS)
+        first["percentile"] = 90
+        second = await generate_roast(MOCK_ANALYSIS)
+        assert mock_client.messages.create.await_count == 1
+        assert "percentile" not in second
+
+        await generate_roast(MOCK_ANALYSIS, persona="gordon")
+        await generate_roast(MOCK_ANALYSIS, bypass_cache=True)
+        assert mock_client.messages.create.await_count == 3
+
+
+@pytest.mark.asyncio
+async def test_complete_text():
+    with patch.dict("os.environ", {"ANTHROPIC_API_KEY": ""}):
+        assert await roast_engine.complete_text("sys", "hi", 10) is None
+    with patch.dict("os.environ", {"ANTHROPIC_API_KEY": "sk-ant-test-key"}), \
+         patch("backend.roaster.roast_engine.anthropic.AsyncAnthropic") as mock_cls:
+        mock_client = AsyncMock()
+        mock_client.messages.create = AsyncMock(return_value=MagicMock(content=[MagicMock(text=" Verdict. \n")]))
+        mock_cls.return_value = mock_client
+        assert await roast_engine.complete_text("sys", "hi", 10) == "Verdict."
+        assert mock_client.messages.create.await_args.kwargs["system"] == "sys"